@@ -0,0 +1,238 @@
+"""Benchmarks hello.py's hot paths on synthetic projects pushed to a local bare remote.
+
+Each scenario generates a project, wires a bare repository up as origin and runs a Committer
+with waits disabled in a fresh process, timing scan, parse (lazy and the up-front process pool),
+planning, selection, commit, push, repository maintenance and state saves. Results are written
+as JSON so runs can be compared between versions, e.g.:
+
+    python benchmark.py --scale 1000:10 --scale 20000:200 --commits 200 --output bench.json
+"""
+import argparse
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import hello
+
+# Phase name -> methods timed for it. Times are exclusive: a push inside a commit only counts as push.
+PHASES = {
+    'scan': [(hello.Committer, '_build_work_index')],
+    'parse': [(hello.Committer, '_extract_methods'), (hello.Committer, '_parse_all')],
+    'plan': [(hello.Committer, '_plan_commits')],
+    'select': [(hello.Committer, '_pick_next')],
+    'commit': [(hello.GitHandler, 'commit_and_push'), (hello.GitHandler, 'commit_content')],
+    'push': [(hello.GitHandler, 'flush')],
+    'maintenance': [(hello.GitHandler, 'maintain')],
+    'state_save': [(hello.State, 'save'), (hello.SQLiteState, 'save')],
+}
+
+
+class PhaseTimer:
+    """Collects exclusive per-call durations for wrapped methods."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {name: [] for name in PHASES}
+        self.stack: List[float] = []  # Time spent in timed children of each active call
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            self.stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.samples[name].append(elapsed - self.stack.pop())
+                if self.stack:
+                    self.stack[-1] += elapsed
+        return timed
+
+    def install(self) -> None:
+        for name, targets in PHASES.items():
+            for cls, attr in targets:
+                if attr in vars(cls):  # Subclasses that inherit a method are covered by the parent
+                    setattr(cls, attr, self.wrap(name, getattr(cls, attr)))
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+
+            def pct(p: float) -> float:
+                return round(ordered[min(count - 1, int(p * count))] * 1000, 3) if count else 0.0
+
+            result[name] = {
+                'count': count,
+                'total_s': round(sum(ordered), 4),
+                'mean_ms': round(sum(ordered) / count * 1000, 3) if count else 0.0,
+                'p50_ms': pct(0.50),
+                'p95_ms': pct(0.95),
+                'max_ms': round(ordered[-1] * 1000, 3) if count else 0.0,
+            }
+        return result
+
+
+def _git(*args: str, cwd: Path) -> None:
+    subprocess.run(['git', *args], cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def setup_repos(base: Path) -> Path:
+    """Creates base/remote.git and a work repository tracking it; returns the work folder."""
+    remote, work = base / 'remote.git', base / 'work'
+    _git('init', '--bare', str(remote), cwd=base)
+    _git('init', '-b', 'main', str(work), cwd=base)
+    _git('config', 'user.name', 'Benchmark', cwd=work)
+    _git('config', 'user.email', 'benchmark@example.com', cwd=work)
+    _git('remote', 'add', 'origin', str(remote), cwd=work)
+    (work / 'README.md').write_text('# Synthetic benchmark project\n')
+    (work / '.gitignore').write_text('node_modules/\n*.log\n')
+    _git('add', 'README.md', '.gitignore', cwd=work)
+    _git('commit', '-m', 'Initial commit', cwd=work)
+    _git('push', '-u', 'origin', 'main', cwd=work)
+    return work
+
+
+def generate_project(root: Path, files: int, functions: int, py_ratio: float, seed: int) -> Dict[str, int]:
+    """Writes a synthetic tree of Python modules and small assets, plus ignored node_modules noise."""
+    rng = random.Random(seed)
+    counts = {'python': 0, 'other': 0, 'ignored': 0}
+    fanout = 100
+    for i in range(files):
+        folder = root / 'src' / f'pkg{i // (fanout * fanout)}' / f'mod{(i // fanout) % fanout}'
+        folder.mkdir(parents=True, exist_ok=True)
+        if rng.random() < py_ratio:
+            body = ''.join(
+                f"def func_{j}(value):\n    total = value + {j}\n    return total * {rng.randint(2, 9)}\n\n\n"
+                for j in range(functions)
+            )
+            (folder / f'module_{i}.py').write_text(f'"""Synthetic module {i}."""\n\n\n' + body)
+            counts['python'] += 1
+        else:
+            (folder / f'asset_{i}.txt').write_bytes(os.urandom(rng.randint(100, 2000)).hex().encode())
+            counts['other'] += 1
+    ignored = root / 'node_modules' / 'dep'
+    ignored.mkdir(parents=True, exist_ok=True)
+    for i in range(max(1, files // 100)):
+        (ignored / f'index_{i}.js').write_text('module.exports = {};\n')
+        counts['ignored'] += 1
+    return counts
+
+
+def _run_committer(options: dict) -> dict:
+    """Runs in a fresh process so peak memory belongs to this scenario only."""
+    timer = PhaseTimer()
+    timer.install()
+    config = hello.build_config(options)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        committer = hello.Committer(config)
+        committer.progress = {}  # Report into a dict instead of redrawing the terminal
+        committer.run()
+    wall = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'wall_s': round(wall, 3),
+        'commits': committer.commits_made,
+        'peak_rss_kb': peak // 1024 if sys.platform == 'darwin' else peak,
+        'phases': timer.summary(),
+    }
+
+
+def run_scenario(files: int, functions: int, args: argparse.Namespace) -> dict:
+    base = Path(tempfile.mkdtemp(prefix='hello-bench-'))
+    try:
+        work = setup_repos(base)
+        start = time.perf_counter()
+        counts = generate_project(work, files, functions, args.py_ratio, args.seed)
+        generate_s = time.perf_counter() - start
+        options = {
+            'folder': str(work), 'repo': 'bench/synthetic', 'min_wait': 0, 'max_wait': 0,
+            'max_commits': args.commits, 'push_every': args.push_every, 'engine': args.engine,
+            'state_backend': args.state_backend,
+        }
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            result = pool.submit(_run_committer, options).result()
+        return {
+            'files': files, 'functions_per_file': functions, 'py_ratio': args.py_ratio, 'seed': args.seed,
+            'engine': args.engine, 'state_backend': args.state_backend, 'push_every': args.push_every,
+            'max_commits': args.commits, 'generated': counts, 'generate_s': round(generate_s, 3),
+            **result,
+        }
+    finally:
+        if args.keep:
+            print(f"Kept scenario files in {base}", file=sys.stderr)
+        else:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+def _tool_version() -> str:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _parse_scale(value: str) -> tuple:
+    try:
+        files, functions = value.split(':')
+        return int(files), int(functions)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected FILES:FUNCTIONS, got {value!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hello.py on synthetic projects with a local bare remote.")
+    parser.add_argument('--scale', type=_parse_scale, action='append', metavar='FILES:FUNCTIONS',
+                        help="Project size: file count and functions per Python file (repeatable, default 1000:10)")
+    parser.add_argument('--commits', type=int, default=200, help="Commits to time per scenario (default: 200)")
+    parser.add_argument('--py-ratio', type=float, default=0.3, help="Share of Python files (default: 0.3)")
+    parser.add_argument('--push-every', type=int, default=1, help="Passed through to hello.py (default: 1)")
+    parser.add_argument('--engine', choices=['worktree', 'objects', 'fast-import'], default='worktree')
+    parser.add_argument('--state-backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--seed', type=int, default=1, help="Seed for the synthetic project (default: 1)")
+    parser.add_argument('--keep', action='store_true', help="Keep the generated repositories")
+    parser.add_argument('--output', help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    scenarios = []
+    for files, functions in args.scale or [(1000, 10)]:
+        print(f"Running {files} files x {functions} functions...", file=sys.stderr)
+        result = run_scenario(files, functions, args)
+        phases = ', '.join(f"{name} {p['total_s']:.2f}s" for name, p in result['phases'].items())
+        print(f"  {result['commits']} commits in {result['wall_s']:.2f}s, peak {result['peak_rss_kb'] // 1024} MB: "
+              f"{phases}", file=sys.stderr)
+        scenarios.append(result)
+
+    report = {
+        'tool_version': _tool_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'scenarios': scenarios,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,488 +1,2874 @@
-def main() -> None:
-    """Parses arguments and runs the committer."""
-    parser = argparse.ArgumentParser(description="Commit Python methods individually to a GitHub repository.")
-    parser.add_argument('--folder', required=True, help="Path to the project folder (Git repository)")
-    parser.add_argument('--token', required=True, help="GitHub personal access token")
-    parser.add_argument('--repo', required=True, help="GitHub repository name (e.g., user/repo)")
-    parser.add_argument('--state-file', help="Path to state file (default: .commit_state.json in project folder)")
-    args = parser.parse_args()
-    config = Config(args.folder, args.token, args.repo, args.state_file)
-    Committer(config).run()
-    def __init__(self, project_folder: str, github_token: str, repo_name: str, state_file: Optional[str] = None):
+import argparse
+import ast
+import asyncio
+import base64
+import contextlib
+import ctypes
+import errno
+import hashlib
+import inspect
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import re
+import select
+import signal
+import sqlite3
+import stat
+import struct
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import git
+from git.objects.fun import tree_entries_from_data, tree_to_stream
+from gitdb import IStream
+from tqdm import tqdm
+
+try:
+    from github import Github, GithubException
+except ImportError:  # Only needed for the GitHub API, which pushing does not use
+    Github = None
+
+
+class Config:
+    """Configuration for the auto-commit process."""
+
+    def __init__(self, project_folder: str, github_token: Optional[str], repo_name: str,
+                 state_file: Optional[str] = None, push_every: int = 1, push_interval: float = 0,
+                 include: Sequence[str] = (), exclude: Sequence[str] = (), state_backend: str = 'json',
+                 engine: str = 'worktree', pipeline: bool = False, min_wait: int = 10, max_wait: int = 50,
+                 max_commits: int = 0, metrics_file: Optional[str] = None, seed: Optional[int] = None,
+                 compress_time: bool = False, group_max_bytes: int = 0, group_max_files: int = 20,
+                 parse_workers: Optional[int] = None, watch: bool = False, watch_interval: float = 30,
+                 remotes: Sequence[str] = ('origin',), push_retries: int = 4, push_backoff: float = 2,
+                 push_timeout: float = 300,
+                 stand_in: Optional[str] = None, stand_in_failures: float = 0, maintenance_loose: int = 2000,
+                 maintenance_packs: int = 16, maintenance_commits: int = 1000):
         self.project_folder = Path(project_folder).resolve()
         self.github_token = github_token
         self.repo_name = repo_name
         self.state_file = Path(state_file or self.project_folder / ".commit_state.json").resolve()
         self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.manifest_file = self.state_file.with_name(self.state_file.stem + '.manifest.json')
+        self.plan_file = self.state_file.with_name(self.state_file.stem + '.plan.json')
+        self.state_db = self.state_file.with_suffix('.db')
+        self.log_file = self.state_file.with_name(self.state_file.stem + '.log')  # Output of a job run by --jobs
+        self.state_backend = state_backend  # 'json' or 'sqlite'
+        self.engine = engine  # 'worktree' (write, add, commit), 'objects' (object database) or 'fast-import'
+        self.pipeline = pipeline  # Overlap pushes and the next pick with the wait on asyncio
+        self.wait_range = (min_wait, max_wait)  # Seconds between commits, drawn uniformly
+        self.max_commits = max_commits  # Stop after this many commits in one run (0 = no limit)
+        self.metrics_file = Path(metrics_file).resolve() if metrics_file else None  # .prom or JSON lines
+        self.seed = seed  # Seed for a new commit plan (None = random); a stored plan keeps its own
+        self.compress_time = compress_time  # Commit back to back, dated by the plan's backdated schedule
+        self.group_max_bytes = group_max_bytes  # Commit small files of a folder together up to this size (0 = off)
+        self.group_max_files = max(1, group_max_files)  # ...and at most this many files per commit
+        self.parse_workers = parse_workers or os.cpu_count() or 1  # Processes parsing Python files when planning
+        self.watch = watch  # Keep running and queue files that are created or changed
+        self.watch_interval = watch_interval  # Seconds between rescans when inotify is not available
+        self.push_every = max(1, push_every)  # Push once this many commits are waiting
+        self.push_interval = push_interval  # ...or once this many seconds passed since the last push (0 = off)
+        self.remotes = list(remotes) or ['origin']  # Git remotes pushed to; the first is primary, the rest mirrors
+        self.push_retries = max(0, push_retries)  # Retries of a failed push before giving up until the next one
+        self.push_backoff = push_backoff  # Seconds before the first retry, doubled for each one after
+        self.push_timeout = push_timeout  # Seconds before a push or fetch is killed and counted as failed (0 = none)
+        self.stand_in = Path(stand_in).resolve() if stand_in else None  # Push to local bare repos here instead
+        self.stand_in_failures = stand_in_failures  # Share of stand-in pushes that fail or are rejected
+        self.maintenance_loose = maintenance_loose  # Pack loose objects once there are this many (0 = off)
+        self.maintenance_packs = maintenance_packs  # Index and combine packs once there are this many (0 = off)
+        self.maintenance_commits = maintenance_commits  # Update the commit-graph every this many commits (0 = off)
+        self.include = list(include)  # Extra globs a file must match (empty = everything)
+        self.exclude = list(exclude)  # Extra globs skipped on top of .gitignore
+
+    def own_files(self) -> Set[str]:
+        """Returns the paths of the files this tool writes, including temporary and set-aside copies."""
+        files = [self.state_file, self.manifest_file, self.plan_file, self.state_db, self.log_file]
+        if self.metrics_file:
+            files.append(self.metrics_file)
+        return {str(f) + suffix for f in files for suffix in ('', '.tmp', '.corrupt', '.migrated', '-wal', '-shm')}
+
+
+class Metrics:
+    """Per-phase timings with rolling percentiles, exported as Prometheus text or JSON lines."""
+
+    WINDOW = 1000  # Samples kept per phase for percentiles
+    QUANTILES = (0.5, 0.9, 0.99)
+
     def __init__(self, config: Config):
         self.config = config
-        self.completed_files: set = set()
-        self.partial_methods: Dict[str, List[int]] = {}  # Maps files to committed method indices
+        self.samples: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+        self.lock = threading.Lock()  # The asyncio pipeline records pushes from worker threads
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Times a block; time spent in a nested phase only counts for the nested phase."""
+        stack = self.local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(name, elapsed - stack.pop())
+            if stack:
+                stack[-1] += elapsed
+
+    def record(self, name: str, seconds: float) -> None:
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.WINDOW)
+                self.counts[name] = 0
+                self.totals[name] = 0.0
+            self.samples[name].append(seconds)
+            self.counts[name] += 1
+            self.totals[name] += seconds
+
+    def summary(self) -> Dict[str, dict]:
+        """Returns count and sum over the run plus percentiles over the last WINDOW samples, per phase."""
+        with self.lock:
+            result = {}
+            for name, window in self.samples.items():
+                ordered = sorted(window)
+                result[name] = {'count': self.counts[name], 'sum': self.totals[name], 'max': ordered[-1]}
+                for q in self.QUANTILES:
+                    result[name][f'p{int(q * 100)}'] = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            return result
+
+    def export(self, gauges: Dict[str, float]) -> None:
+        """Writes the summary and run gauges to the metrics file, if one is configured."""
+        path = self.config.metrics_file
+        if path is None:
+            return
+        summary = self.summary()
+        try:
+            if path.suffix == '.prom':
+                job = self.config.repo_name.replace('\\', '\\\\').replace('"', '\\"')
+                lines = ['# HELP hello_phase_seconds Time spent per phase of the commit loop.',
+                         '# TYPE hello_phase_seconds summary']
+                for name, stats in summary.items():
+                    labels = f'job="{job}",phase="{name}"'
+                    for q in self.QUANTILES:
+                        lines.append(f'hello_phase_seconds{{{labels},quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+                    lines.append(f'hello_phase_seconds_sum{{{labels}}} {stats["sum"]:.6f}')
+                    lines.append(f'hello_phase_seconds_count{{{labels}}} {stats["count"]}')
+                for name, value in gauges.items():
+                    lines.append(f'# TYPE hello_{name} gauge')
+                    lines.append(f'hello_{name}{{job="{job}"}} {value}')
+                tmp_file = path.with_name(path.name + '.tmp')
+                tmp_file.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+                os.replace(tmp_file, path)
+            else:
+                record = {'time': time.time(), 'job': self.config.repo_name, **gauges, 'phases': summary}
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        except OSError as e:
+            print(f"Error exporting metrics: {e}")
+
+
+def _bit_count(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+def _bit_indices(bits: int) -> Iterator[int]:
+    """Yields the positions of the set bits, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def _dump_json_atomically(path: Path, data, **options) -> None:
+    """Writes data as JSON to a temporary file, syncs it to disk and moves it over path.
+
+    Without the fsync a crash shortly after the rename can leave an empty or truncated file.
+    """
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **options)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+
+
+def _pack_paths(paths: Iterable[str]) -> str:
+    """Encodes paths as the sorted, newline-joined list, zlib-compressed and base64'd for JSON.
+
+    Sorted paths share long prefixes, so this is a small fraction of a JSON array of them.
+    """
+    return base64.b64encode(zlib.compress('\n'.join(sorted(paths)).encode('utf-8'), 1)).decode('ascii')
+
+
+def _unpack_paths(packed: str) -> List[str]:
+    text = zlib.decompress(base64.b64decode(packed)).decode('utf-8')
+    return [sys.intern(path) for path in text.split('\n')] if text else []
+
+
+class State:
+    """Tracks committed files and methods across runs."""
+
+    GROUPED = -1  # method_idx of a plan entry committed together with the file entry before it
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.completed_files: Set[str] = set()  # Interned relative paths, shared with the work index
+        self.partial_methods: Dict[str, int] = {}  # Maps files to a bitset of committed method indices
+        self.packed_completed: Optional[str] = None  # Encoded completed_files, kept until it changes
+        self.unpushed_commits: List[str] = []  # Local commits not yet pushed to the primary remote
+        self.remote_heads: Dict[str, str] = {}  # Mirror remote -> last commit pushed there
         self.current_wait_until: Optional[datetime] = None
         self.start_time = datetime.now()
         self.first_run = True
+        self.plan: List[Tuple[str, Optional[int], int]] = []  # (rel_path, method_idx/None/GROUPED, unix time)
+        self.plan_pos = 0  # Index of the next plan entry to commit
+        self.plan_seed: Optional[int] = None
+
+    @staticmethod
+    def create(config: Config) -> 'State':
+        """Returns the state backend selected in the config."""
+        return SQLiteState(config) if config.state_backend == 'sqlite' else State(config)
+
     def load(self) -> None:
-        """Loads state from file if it exists."""
+        """Loads state from file if it exists.
+
+        Everything is parsed into locals first, so a file that fails halfway leaves no partial state.
+        """
         if not self.config.state_file.exists():
             return
         try:
             with open(self.config.state_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self.completed_files = set(data.get('completed_files', []))
-                self.partial_methods = {k: [int(i) for i in v] for k, v in data.get('partial_methods', {}).items()}
-                if wait_ts := data.get('current_wait_until'):
-                    self.current_wait_until = datetime.fromtimestamp(wait_ts)
-                if start_ts := data.get('start_time'):
-                    self.start_time = datetime.fromtimestamp(start_ts)
-                    self.first_run = False
-            print(f"Loaded state: {len(self.completed_files)} completed files")
+            packed = completed = data.get('completed_files', [])
+            if isinstance(completed, str):
+                completed = _unpack_paths(completed)
+            else:
+                packed = None
+            completed_files = set(map(sys.intern, completed))
+            partial_methods = {}
+            for rel_path, committed in data.get('partial_methods', {}).items():
+                if isinstance(committed, list):  # Written before bitsets: a list of indices
+                    bits = sum(1 << int(i) for i in set(committed))
+                else:
+                    bits = int(committed, 16)
+                partial_methods[sys.intern(rel_path)] = bits
+            unpushed_commits = list(data.get('unpushed_commits', []))
+            remote_heads = dict(data.get('remote_heads', {}))
+            wait_ts, start_ts = data.get('current_wait_until'), data.get('start_time')
+            current_wait_until = datetime.fromtimestamp(wait_ts) if wait_ts else None
+            start_time = datetime.fromtimestamp(start_ts) if start_ts else None
+            plan_pos, plan_seed = int(data.get('plan_pos', 0)), data.get('plan_seed')
         except Exception as e:
-            print(f"Error loading state: {e}, starting fresh")
+            corrupt_file = self.config.state_file.with_name(self.config.state_file.name + '.corrupt')
+            os.replace(self.config.state_file, corrupt_file)
+            print(f"Error loading state: {e}, moved it to {corrupt_file.name} and starting fresh")
+            return
+        self.completed_files, self.packed_completed = completed_files, packed
+        self.partial_methods = partial_methods
+        self.unpushed_commits, self.remote_heads = unpushed_commits, remote_heads
+        self.current_wait_until = current_wait_until
+        if start_time:
+            self.start_time, self.first_run = start_time, False
+        self.plan_pos, self.plan_seed = plan_pos, plan_seed
+        self.plan = self._read_plan() if plan_seed is not None else []
+        print(f"Loaded state: {len(self.completed_files)} completed files")
+
+    def _read_plan(self) -> List[Tuple[str, Optional[int], int]]:
+        """Reads the stored plan; without a readable one the remaining work is simply planned again."""
+        if not self.config.plan_file.exists():
+            return []
+        try:
+            with open(self.config.plan_file, 'r', encoding='utf-8') as f:
+                return [(sys.intern(path), method_idx, when) for path, method_idx, when in json.load(f)]
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error loading plan: {e}, planning the remaining work again")
+            return []
+
     def save(self) -> None:
-        """Saves state to file."""
+        """Saves state to file.
+
+        Completed files are stored packed (see _pack_paths) and committed methods as hex bitsets;
+        the packed list is only rebuilt after a file was completed or reopened.
+        """
         try:
+            if self.packed_completed is None:
+                self.packed_completed = _pack_paths(self.completed_files)
             data = {
-                'completed_files': list(self.completed_files),
-                'partial_methods': self.partial_methods,
+                'completed_files': self.packed_completed,
+                'partial_methods': {rel_path: format(bits, 'x') for rel_path, bits in self.partial_methods.items()},
+                'unpushed_commits': self.unpushed_commits,
+                'remote_heads': self.remote_heads,
                 'start_time': self.start_time.timestamp(),
-                'current_wait_until': self.current_wait_until.timestamp() if self.current_wait_until else None
+                'current_wait_until': self.current_wait_until.timestamp() if self.current_wait_until else None,
+                'plan_pos': self.plan_pos,
+                'plan_seed': self.plan_seed
             }
-            with open(self.config.state_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            _dump_json_atomically(self.config.state_file, data, indent=2)
             print(f"State saved at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         except Exception as e:
             print(f"Error saving state: {e}")
+
+    def set_plan(self, seed: int, plan: List[Tuple[str, Optional[int], int]]) -> None:
+        """Stores a new commit plan. It is written once, apart from the state saved after every commit."""
+        self.plan, self.plan_pos, self.plan_seed = plan, 0, seed
+        try:
+            _dump_json_atomically(self.config.plan_file, plan, separators=(',', ':'))
+        except OSError as e:
+            print(f"Error saving plan: {e}")
+        self.save()
+
+    def is_method_committed(self, rel_path: str, method_idx: int) -> bool:
+        return bool(self.partial_methods.get(rel_path, 0) >> method_idx & 1)
+
+    def committed_methods(self, rel_path: str) -> List[int]:
+        return list(_bit_indices(self.partial_methods.get(rel_path, 0)))
+
+    def mark_method(self, rel_path: str, method_idx: int) -> int:
+        """Records a committed method and returns how many methods of the file are committed."""
+        bits = self.partial_methods[rel_path] = self.partial_methods.get(rel_path, 0) | 1 << method_idx
+        return _bit_count(bits)
+
+    def mark_completed(self, rel_path: str) -> None:
+        self.completed_files.add(sys.intern(rel_path))
+        self.partial_methods.pop(rel_path, None)
+        self.packed_completed = None
+
+    def reopen(self, rel_path: str, committed: Iterable[int]) -> None:
+        """Marks a changed file as not completed, keeping the given method indices as committed."""
+        if rel_path in self.completed_files:
+            self.completed_files.discard(rel_path)
+            self.packed_completed = None
+        bits = sum(1 << i for i in set(committed))
+        if bits:
+            self.partial_methods[rel_path] = bits
+        else:
+            self.partial_methods.pop(rel_path, None)
+
+    def add_unpushed(self, sha: str) -> None:
+        self.unpushed_commits.append(sha)
+
+    def clear_unpushed(self) -> None:
+        self.unpushed_commits.clear()
+
+    def set_remote_head(self, remote: str, sha: str) -> None:
+        self.remote_heads[remote] = sha
+
+    def remove(self) -> None:
+        """Deletes the state once the job is finished."""
+        for state_file in (self.config.state_file, self.config.plan_file):
+            if state_file.exists():
+                os.remove(state_file)
+
+
+class SQLiteState(State):
+    """State kept in a SQLite database (WAL mode), updated with one small transaction per change."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS completed_files (path TEXT PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS method_bits (path TEXT PRIMARY KEY, bits TEXT);
+        CREATE TABLE IF NOT EXISTS unpushed_commits (seq INTEGER PRIMARY KEY AUTOINCREMENT, sha TEXT);
+        CREATE TABLE IF NOT EXISTS remote_heads (remote TEXT PRIMARY KEY, sha TEXT);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+        CREATE TABLE IF NOT EXISTS plan (pos INTEGER PRIMARY KEY, path TEXT, method_idx INTEGER, due INTEGER);
+    """
+
     def __init__(self, config: Config):
-        self.config = config
-        self.repo = self._init_repo()
+        super().__init__(config)
+        self.conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            # The asyncio pipeline pushes (and so clears unpushed rows) from a worker thread, never concurrently
+            self.conn = sqlite3.connect(self.config.state_db, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(self.SCHEMA)
+        return self.conn
+
+    def _migrate_json(self) -> None:
+        """Imports an existing JSON state file into the database and moves the file aside."""
+        State.load(self)
+        if not self.config.state_file.exists():
+            return
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO completed_files (path) VALUES (?)',
+                                  ((path,) for path in self.completed_files))
+            self.conn.executemany('INSERT OR REPLACE INTO method_bits (path, bits) VALUES (?, ?)',
+                                  ((path, format(bits, 'x')) for path, bits in self.partial_methods.items()))
+            self.conn.executemany('INSERT INTO unpushed_commits (sha) VALUES (?)',
+                                  ((sha,) for sha in self.unpushed_commits))
+            self.conn.executemany('INSERT OR REPLACE INTO remote_heads (remote, sha) VALUES (?, ?)',
+                                  self.remote_heads.items())
+            self.conn.executemany('INSERT INTO plan (pos, path, method_idx, due) VALUES (?, ?, ?, ?)',
+                                  ((pos, *entry) for pos, entry in enumerate(self.plan)))
+            self.conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', self._meta())
+        migrated_file = self.config.state_file.with_name(self.config.state_file.name + '.migrated')
+        os.replace(self.config.state_file, migrated_file)
+        if self.config.plan_file.exists():
+            os.replace(self.config.plan_file, self.config.plan_file.with_name(self.config.plan_file.name + '.migrated'))
+        print(f"Migrated {self.config.state_file.name} to {self.config.state_db.name}")
+
+    def _migrate_partial_methods(self) -> None:
+        """Folds the one-row-per-method table of older databases into per-file bitsets."""
+        bits: Dict[str, int] = {}
+        with self.conn:
+            for path, method_idx in self.conn.execute('SELECT path, method_idx FROM partial_methods'):
+                bits[path] = bits.get(path, 0) | 1 << method_idx
+            self.conn.executemany('INSERT OR REPLACE INTO method_bits (path, bits) VALUES (?, ?)',
+                                  ((path, format(value, 'x')) for path, value in bits.items()))
+            self.conn.execute('DROP TABLE partial_methods')
+
+    def _meta(self) -> List[Tuple[str, Optional[float]]]:
+        return [
+            ('start_time', self.start_time.timestamp()),
+            ('current_wait_until', self.current_wait_until.timestamp() if self.current_wait_until else None),
+            ('plan_pos', self.plan_pos),
+            ('plan_seed', self.plan_seed)
+        ]
+
+    def load(self) -> None:
+        """Loads state from the database, migrating a JSON state file on first use."""
         try:
-            self.github = Github(config.github_token)
-            owner, repo_name = config.repo_name.split('/')
-            self.github_repo = self.github.get_user(owner).get_repo(repo_name)
-            print(f"Connected to GitHub repo: {config.repo_name}")
-        except GithubException as e:
-            print(f"Error connecting to GitHub: {e}")
+            conn = self._connect()
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+            if 'start_time' not in meta and self.config.state_file.exists():
+                self._migrate_json()
+                meta = dict(conn.execute('SELECT key, value FROM meta'))
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'partial_methods'").fetchone():
+                self._migrate_partial_methods()
+            self.completed_files = {sys.intern(path) for (path,) in conn.execute('SELECT path FROM completed_files')}
+            self.partial_methods = {sys.intern(path): int(bits, 16)
+                                    for path, bits in conn.execute('SELECT path, bits FROM method_bits')}
+            self.unpushed_commits = [sha for (sha,) in conn.execute('SELECT sha FROM unpushed_commits ORDER BY seq')]
+            self.remote_heads = dict(conn.execute('SELECT remote, sha FROM remote_heads'))
+            self.current_wait_until = None
+            if wait_ts := meta.get('current_wait_until'):
+                self.current_wait_until = datetime.fromtimestamp(wait_ts)
+            if start_ts := meta.get('start_time'):
+                self.start_time = datetime.fromtimestamp(start_ts)
+                self.first_run = False
+            self.plan_pos = meta.get('plan_pos') or 0
+            self.plan_seed = meta.get('plan_seed')
+            rows = conn.execute('SELECT path, method_idx, due FROM plan ORDER BY pos')
+            self.plan = [(sys.intern(path), method_idx, due) for path, method_idx, due in rows]
+            print(f"Loaded state: {len(self.completed_files)} completed files")
+        except sqlite3.Error as e:
+            print(f"Error loading state database {self.config.state_db}: {e}")
             raise SystemExit(1)
-    def _init_repo(self) -> git.Repo:
-        """Initializes the Git repository."""
+
+    def save(self) -> None:
+        """Saves the timing fields; per-commit progress is already written by the mark_* methods."""
         try:
-            repo = git.Repo(self.config.project_folder)
-            origin = repo.remote(name='origin')
-            print(f"Using git repo at {self.config.project_folder}, remote: {origin.url}")
-            return repo
-        except Exception as e:
-            print(f"Error initializing repo: {e}")
-            raise SystemExit(1)
-    def commit_and_push(self, file_path: Path, message: str) -> bool:
-        """Commits and pushes a file with the given message."""
-        rel_path = str(file_path.relative_to(self.config.project_folder))
+            with self._connect() as conn:
+                conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', self._meta())
+            print(f"State saved at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        except sqlite3.Error as e:
+            print(f"Error saving state: {e}")
+
+    def set_plan(self, seed: int, plan: List[Tuple[str, Optional[int], int]]) -> None:
+        self.plan, self.plan_pos, self.plan_seed = plan, 0, seed
+        with self._connect() as conn:
+            conn.execute('DELETE FROM plan')
+            conn.executemany('INSERT INTO plan (pos, path, method_idx, due) VALUES (?, ?, ?, ?)',
+                             ((pos, *entry) for pos, entry in enumerate(plan)))
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', self._meta())
+
+    def mark_method(self, rel_path: str, method_idx: int) -> int:
+        count = super().mark_method(rel_path, method_idx)
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO method_bits (path, bits) VALUES (?, ?)',
+                         (rel_path, format(self.partial_methods[rel_path], 'x')))
+        return count
+
+    def mark_completed(self, rel_path: str) -> None:
+        super().mark_completed(rel_path)
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO completed_files (path) VALUES (?)', (rel_path,))
+            conn.execute('DELETE FROM method_bits WHERE path = ?', (rel_path,))
+
+    def reopen(self, rel_path: str, committed: Iterable[int]) -> None:
+        super().reopen(rel_path, committed)
+        with self._connect() as conn:
+            conn.execute('DELETE FROM completed_files WHERE path = ?', (rel_path,))
+            conn.execute('DELETE FROM method_bits WHERE path = ?', (rel_path,))
+            if rel_path in self.partial_methods:
+                conn.execute('INSERT INTO method_bits (path, bits) VALUES (?, ?)',
+                             (rel_path, format(self.partial_methods[rel_path], 'x')))
+
+    def add_unpushed(self, sha: str) -> None:
+        super().add_unpushed(sha)
+        with self._connect() as conn:
+            conn.execute('INSERT INTO unpushed_commits (sha) VALUES (?)', (sha,))
+
+    def clear_unpushed(self) -> None:
+        super().clear_unpushed()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM unpushed_commits')
+
+    def set_remote_head(self, remote: str, sha: str) -> None:
+        super().set_remote_head(remote, sha)
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO remote_heads (remote, sha) VALUES (?, ?)', (remote, sha))
+
+    def remove(self) -> None:
+        """Closes and deletes the database, and any migrated JSON files, once the job is finished."""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        for suffix in ('', '-wal', '-shm'):
+            db_file = Path(str(self.config.state_db) + suffix)
+            if db_file.exists():
+                os.remove(db_file)
+        for state_file in (self.config.state_file, self.config.plan_file):  # Moved aside by _migrate_json
+            migrated_file = state_file.with_name(state_file.name + '.migrated')
+            if migrated_file.exists():
+                os.remove(migrated_file)
+
+
+_POSIX_CLASSES = {  # Character classes of bracket expressions, as regex class bodies
+    'alnum': 'a-zA-Z0-9', 'alpha': 'a-zA-Z', 'blank': r' \t', 'cntrl': r'\x00-\x1f\x7f', 'digit': '0-9',
+    'graph': r'\x21-\x7e', 'lower': 'a-z', 'print': r'\x20-\x7e', 'space': r' \t\n\r\f\v', 'upper': 'A-Z',
+    'xdigit': '0-9A-Fa-f', 'punct': re.escape('!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~'),
+}
+
+
+def _bracket_to_regex(body: str) -> str:
+    """Translates the inside of a glob bracket expression into a regex character class."""
+    negated = body[:1] in ('!', '^')
+    if negated:
+        body = body[1:]
+    out, i = [], 0
+    while i < len(body):
+        if body.startswith('[:', i) and ':]' in body[i+2:]:
+            end = body.index(':]', i + 2)
+            name = body[i+2:end]
+            if name not in _POSIX_CLASSES:
+                raise re.error(f"unknown character class [:{name}:]")
+            out.append(_POSIX_CLASSES[name])
+            i = end + 2
+            continue
+        c = body[i]
+        if c == '\\' and i + 1 < len(body):
+            i += 1
+            out.append(re.escape(body[i]))
+        else:
+            out.append(c if c == '-' else re.escape(c))  # Unescaped dashes keep making ranges
+        i += 1
+    return ('[^/' if negated else '[') + ''.join(out) + ']'
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translates a gitignore-style glob into a regex body matched against '/'-separated paths."""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i):
+                at_start = i == 0 or pattern[i-1] == '/'
+                if at_start and pattern.startswith('**/', i):
+                    out.append('(?:.*/)?')
+                    i += 3
+                    continue
+                if at_start and i + 2 == n:
+                    out.append('.*')
+                    i += 2
+                    continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = i + 1
+            if pattern[end:end+1] in ('!', '^'):
+                end += 1
+            if pattern[end:end+1] == ']':  # A ']' right after the opening bracket is literal
+                end += 1
+            while end < n and pattern[end] != ']':
+                if pattern.startswith('[:', end) and ':]' in pattern[end+2:]:
+                    end = pattern.index(':]', end + 2) + 2
+                elif pattern[end] == '\\':
+                    end += 2
+                else:
+                    end += 1
+            if end >= n:
+                out.append(re.escape(c))
+            else:
+                out.append(_bracket_to_regex(pattern[i+1:end]))
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class IgnoreRules:
+    """Compiled patterns from one .gitignore (or CLI glob list), relative to a base directory."""
+
+    def __init__(self, base: str, lines: Sequence[str]):
+        self.base = base  # '/'-terminated relative directory, '' for the project root
+        self.rules: List[Tuple[re.Pattern, bool, bool]] = []  # (regex, negated, directories only)
+        for line in lines:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line.endswith('\\ '):
+                line = line.rstrip(' ')
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            if negated or line.startswith('\\!') or line.startswith('\\#'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if not line:
+                continue
+            anchored = '/' in line
+            line = line.lstrip('/')
+            try:
+                regex = _glob_to_regex(line)
+                if not anchored:
+                    regex = '(?:.*/)?' + regex
+                self.rules.append((re.compile(regex + r'\Z', re.DOTALL), negated, dir_only))
+            except re.error as e:
+                print(f"Warning: skipping ignore pattern {line!r} in {base or './'}: {e}")
+        self.has_negation = any(negated for _, negated, _ in self.rules)
+        if not self.has_negation:
+            # Without negations the last match cannot flip, so one alternation per kind is enough
+            self.any_regex = self._combine(r for r, _, _ in self.rules)
+            self.file_regex = self._combine(r for r, _, dir_only in self.rules if not dir_only)
+
+    @staticmethod
+    def _combine(regexes: Iterator[re.Pattern]) -> Optional[re.Pattern]:
+        parts = [r.pattern for r in regexes]
+        return re.compile('|'.join(f'(?:{p})' for p in parts), re.DOTALL) if parts else None
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """Returns True if ignored, False if re-included by a negation, None if no rule matched."""
+        if not rel_path.startswith(self.base):
+            return None
+        sub = rel_path[len(self.base):]
+        if not self.has_negation:
+            regex = self.any_regex if is_dir else self.file_regex
+            return True if regex and regex.match(sub) else None
+        for regex, negated, dir_only in reversed(self.rules):
+            if (is_dir or not dir_only) and regex.match(sub):
+                return not negated
+        return None
+
+
+class FileScanner:
+    """Walks the project with os.scandir, pruning ignored directories and yielding files as it goes."""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.root = str(config.project_folder)
+        self.skip_paths = config.own_files()  # State, manifest, plan, database and log files
+        self.exclude = IgnoreRules('', config.exclude) if config.exclude else None
+        self.include = IgnoreRules('', config.include) if config.include else None
+        self.dirs: Dict[str, Tuple[str, List[IgnoreRules]]] = {}  # With stats: dir -> (rel_dir, rules in effect)
+
+    def _read_rules(self, path: str, base: str) -> Optional[IgnoreRules]:
         try:
-            if not file_path.exists():
-                print(f"File not found: {rel_path}")
-                return False
-            self.repo.git.add(str(file_path))
-            if not self.repo.is_dirty(path=str(file_path)):
-                print(f"No changes to commit for {rel_path}")
-                return True
-            self.repo.index.commit(message)
-            self.repo.remote(name='origin').push()
-            print(f"Committed and pushed: {rel_path}")
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                rules = IgnoreRules(base, f.readlines())
+            return rules if rules.rules else None
+        except OSError:
+            return None
+
+    def _ignored(self, rel_path: str, is_dir: bool, rules: List[IgnoreRules]) -> bool:
+        if self.exclude and self.exclude.match(rel_path, is_dir):
             return True
-        except GithubException as e:
-            print(f"GitHub error for {rel_path}: {e}")
-            return False
-        except Exception as e:
-            print(f"Error committing {rel_path}: {e}")
+        for rule_set in reversed(rules):  # Deeper .gitignore files take precedence
+            result = rule_set.match(rel_path, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def wanted(self, path: str, rel_path: str, rules: List[IgnoreRules]) -> bool:
+        """Returns True if the file is one the scan yields, given the rules of its directory."""
+        if path in self.skip_paths or os.path.basename(path) == '.git' or self._ignored(rel_path, False, rules):
             return False
-    def __init__(self, config: Config):
-        self.config = config
-        self.state = State(config)
-        self.git = GitHandler(config)
-        self.all_files = self._get_all_files()
-    def _get_all_files(self) -> List[Path]:
-        """Gets all files in the project directory, excluding .git and state file."""
-        files = [
-            p for p in self.config.project_folder.rglob('*')
-            if p.is_file() and '.git' not in str(p) and p != self.config.state_file
-        ]
-        print(f"Found {len(files)} files")
-        return files
-    def _extract_methods(self, file_path: Path) -> Tuple[List[str], List[str]]:
-        """Extracts method definitions from a Python file using AST."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            tree = ast.parse(content)
-            methods = []
-            method_names = []
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    method_code = '\n'.join(content.splitlines()[node.lineno-1:node.end_lineno])
-                    methods.append(method_code)
-                    method_names.append(node.name)
-            return methods, method_names
-        except (UnicodeDecodeError, SyntaxError) as e:
-            print(f"Cannot parse {file_path}: {e}")
-            return [], []
-    def _get_remaining_files(self) -> Tuple[List[Path], List[Path]]:
-        """Separates remaining files into Python and non-Python files."""
-        python_files, other_files = [], []
-        for file in self.all_files:
-            rel_path = str(file.relative_to(self.config.project_folder))
-            if rel_path in self.state.completed_files:
+        return not self.include or self.include.match(rel_path, False) is True
+
+    def scan(self, stats: Optional[Dict[str, Tuple[int, int]]] = None,
+             start: Optional[Tuple[str, str, List[IgnoreRules]]] = None) -> Iterator[str]:
+        """Yields the relative path of every non-ignored file below the project folder.
+
+        Entries named .git are skipped whatever their type, and so are nested repositories, i.e.
+        submodules and other worktrees, which git add refuses. A (path, rel_dir, rules) start scans
+        only that directory. With a stats dict, it also records each file's (size, mtime_ns) there
+        and each directory with its rules in self.dirs, for the watcher.
+        """
+        if start is None:
+            root_rules = [r for r in (self._read_rules(os.path.join(self.root, '.git', 'info', 'exclude'), ''),) if r]
+            start = (self.root, '', root_rules)
+        stack: List[Tuple[str, str, List[IgnoreRules]]] = [start]
+        while stack:
+            dir_path, rel_dir, rules = stack.pop()
+            if rel_dir and os.path.lexists(os.path.join(dir_path, '.git')):
+                continue  # A submodule or nested repository: its files belong to that repository
+            local = self._read_rules(os.path.join(dir_path, '.gitignore'), rel_dir)
+            if local:
+                rules = rules + [local]
+            if stats is not None:
+                self.dirs[dir_path] = (rel_dir, rules)
+            try:
+                entries = os.scandir(dir_path)
+            except OSError as e:
+                print(f"Cannot scan {dir_path}: {e}")
                 continue
-            if file.suffix == '.py':
-                python_files.append(file)
-            else:
-                other_files.append(file)
-        return python_files, other_files
-    def _commit_method(self, file_path: Path, method_content: str, method_name: str, method_idx: int) -> bool:
-        """Commits a single method to the repository."""
-        rel_path = str(file_path.relative_to(self.config.project_folder))
+            with entries:
+                for entry in entries:
+                    if entry.name == '.git':
+                        continue
+                    rel_path = rel_dir + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self._ignored(rel_path, True, rules):
+                                stack.append((entry.path, rel_path + '/', rules))
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if not self.wanted(entry.path, rel_path, rules):
+                        continue
+                    if stats is not None:
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        stats[rel_path] = (st.st_size, st.st_mtime_ns)
+                    yield rel_path if os.sep == '/' else rel_path.replace('/', os.sep)
+
+
+class Inotify:
+    """Minimal inotify binding over ctypes; raises OSError where inotify is not available."""
+
+    IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x8, 0x40, 0x80, 0x100, 0x200
+    IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+    def __init__(self):
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(method_content.strip() + '\n')
-            commit_msg = f"Add method {method_name} in {rel_path} (index {method_idx})"
-            success = self.git.commit_and_push(file_path, commit_msg)
-            if success:
-                self.state.partial_methods.setdefault(rel_path, []).append(method_idx)
-                if len(self.state.partial_methods[rel_path]) == len(self._extract_methods(file_path)[0]):
-                    self.state.completed_files.add(rel_path)
-                    del self.state.partial_methods[rel_path]
-            return success
-        except Exception as e:
-            print(f"Error committing method {method_name}: {e}")
-            return False
-    def _commit_whole_file(self, file_path: Path) -> bool:
-        """Commits an entire non-Python file."""
-        rel_path = str(file_path.relative_to(self.config.project_folder))
-        success = self.git.commit_and_push(file_path, f"Add {rel_path}")
-        if success:
-            self.state.completed_files.add(rel_path)
-        return success
-    def _display_progress(self, python_files: List[Path], other_files: List[Path]) -> None:
-        """Displays progress with a progress bar and time estimates."""
-        total_files = len(self.all_files)
-        completed = len(self.state.completed_files)
-        remaining = len(python_files) + len(other_files)
-        progress_pct = (completed / total_files * 100) if total_files else 0
-        elapsed = datetime.now() - self.state.start_time
-        eta_str = "Unknown"
-        if completed > 0 and remaining > 0:
-            seconds_per_file = elapsed.total_seconds() / completed
-            eta = timedelta(seconds=int(seconds_per_file * remaining))
-            eta_str = str(eta)
-        bar_length = 40
-        filled = int(bar_length * completed / total_files) if total_files else 0
-        bar = '█' * filled + '░' * (bar_length - filled)
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print(f"\n{'=' * 60}\nGitHub Auto-Commit Progress\n{'=' * 60}")
-        print(f"Progress: [{bar}] {progress_pct:.1f}%")
-        print(f"Files: {completed}/{total_files} completed, {remaining} remaining")
-        print(f"Types: {len(python_files)} Python, {len(other_files)} other")
-        print(f"Time elapsed: {elapsed}")
-        print(f"Estimated time remaining: {eta_str}\n{'=' * 60}\n")
-    def run(self) -> None:
-        """Runs the commit process with wait intervals and state management."""
-        self.state.load()
+            self.libc = ctypes.CDLL(None, use_errno=True)
+            self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except AttributeError:
+            raise OSError("inotify is not supported on this platform")
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"cannot watch {path}: {os.strerror(error)}")
+        return wd
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def read(self, timeout: Optional[float]) -> List[Tuple[int, int, str]]:
+        """Returns (wd, mask, name) events, waiting up to timeout seconds (None = until one arrives)."""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
         try:
-            if self.state.current_wait_until and not self.state.first_run:
-                wait_seconds = (self.state.current_wait_until - datetime.now()).total_seconds()
-                if wait_seconds > 0:
-                    print(f"Resuming wait: {int(wait_seconds)} seconds")
-                    for _ in tqdm(range(int(wait_seconds)), desc="Waiting to resume"):
-                        time.sleep(1)
-                self.state.current_wait_until = None
-                self.state.save()
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            events.append((wd, mask, os.fsdecode(data[offset:offset + length].rstrip(b'\0'))))
+            offset += length
+        return events
 
-            while True:
-                python_files, other_files = self._get_remaining_files()
-                self._display_progress(python_files, other_files)
-                if not python_files and not other_files:
-                    print("\n🎉 All files committed successfully! 🎉")
-                    if self.config.state_file.exists():
-                        os.remove(self.config.state_file)
-                    break
 
-                file_to_commit = None
-                if python_files and (not other_files or random.random() < 0.7):
-                    file_to_commit = random.choice(python_files)
-                    methods, method_names = self._extract_methods(file_to_commit)
-                    rel_path = str(file_to_commit.relative_to(self.config.project_folder))
-                    committed_indices = set(self.state.partial_methods.get(rel_path, []))
-                    uncommitted = [i for i in range(len(methods)) if i not in committed_indices]
-                    if not uncommitted:
-                        self.state.completed_files.add(rel_path)
-                        if rel_path in self.state.partial_methods:
-                            del self.state.partial_methods[rel_path]
-                        continue
-                    method_idx = random.choice(uncommitted)
-                    print(f"Committing method {method_names[method_idx]} in {file_to_commit.name}")
-                    self._commit_method(file_to_commit, methods[method_idx], method_names[method_idx], method_idx)
-                    with open(file_to_commit, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(methods))  # Restore original content
-                elif other_files:
-                    file_to_commit = random.choice(other_files)
-                    print(f"Committing file: {file_to_commit.name}")
-                    self._commit_whole_file(file_to_commit)
-
-                interval = random.randint(10, 50)
-                self.state.current_wait_until = datetime.now() + timedelta(seconds=interval)
-                self.state.save()
-                print(f"\nNext commit at: {self.state.current_wait_until.strftime('%H:%M:%S')}")
-                print(f"Waiting {interval} seconds...")
+class TreeWatcher:
+    """Reports files created, changed or deleted in the project while a --watch job runs.
+
+    With inotify every scanned directory is watched and each event is checked against the
+    ignore rules of its directory, so only the touched paths are looked at. Without it, a
+    stat-only rescan is compared with the previous one every --watch-interval seconds.
+    """
+
+    def __init__(self, config: Config, scanner: FileScanner, stats: Dict[str, Tuple[int, int]]):
+        self.config = config
+        self.scanner = scanner
+        self.stats = stats  # rel_path ('/'-separated) -> (size, mtime_ns) of every tracked file
+        self.last_scan = time.monotonic()
+        self.watches: Dict[int, str] = {}  # Watch descriptor -> directory
+        try:
+            self.inotify: Optional[Inotify] = Inotify()
+        except OSError as e:
+            self.inotify = None
+            print(f"Cannot use inotify ({e}), checking for changes every {config.watch_interval:g} seconds")
+            return
+        self._watch_dirs(scanner.dirs)
+        if self.inotify:
+            print(f"Watching {len(self.watches)} directories with inotify")
+
+    def _watch_dirs(self, dirs: Iterable[str]) -> None:
+        """Watches each directory, skipping ones that are gone by now.
+
+        Any other failure, typically ENOSPC once fs.inotify.max_user_watches is used up, switches
+        the watcher to periodic rescans.
+        """
+        for dir_path in list(dirs):
+            try:
+                self.watches[self.inotify.add_watch(dir_path)] = dir_path
+            except OSError as e:
+                if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                    self.scanner.dirs.pop(dir_path, None)
+                    continue
+                self.inotify.close()
+                self.inotify, self.watches = None, {}
+                print(f"Cannot use inotify ({e}), checking for changes every {self.config.watch_interval:g} seconds")
+                return
+
+    def _rescan(self) -> Tuple[Set[str], Set[str]]:
+        """Diffs a full stat-only scan against the previous state."""
+        self.scanner.dirs = {}
+        stats: Dict[str, Tuple[int, int]] = {}
+        for _ in self.scanner.scan(stats=stats):
+            pass
+        changed = {rel_path for rel_path, st in stats.items() if self.stats.get(rel_path) != st}
+        deleted = self.stats.keys() - stats.keys()
+        self.stats = stats
+        self.last_scan = time.monotonic()
+        if self.inotify:
+            self.watches = {}
+            self._watch_dirs(self.scanner.dirs)
+        return changed, deleted
+
+    def _apply_events(self, events: List[Tuple[int, int, str]]) -> Tuple[Set[str], Set[str]]:
+        changed: Set[str] = set()
+        deleted: Set[str] = set()
+        for wd, mask, name in events:
+            if mask & Inotify.IN_Q_OVERFLOW or name == '.gitignore':
+                return self._rescan()  # Events were lost, or the ignore rules changed
+            if mask & Inotify.IN_IGNORED:  # The directory is gone
+                self.scanner.dirs.pop(self.watches.pop(wd, ''), None)
+                continue
+            dir_path = self.watches.get(wd)
+            if dir_path not in self.scanner.dirs:
+                continue
+            rel_dir, rules = self.scanner.dirs[dir_path]
+            path, rel_path = os.path.join(dir_path, name), rel_dir + name
+            if mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                prefix = rel_path + '/'
+                gone = [p for p in self.stats if p.startswith(prefix)] if mask & Inotify.IN_ISDIR else [rel_path]
+                for gone_path in gone:
+                    if self.stats.pop(gone_path, None) is not None:
+                        deleted.add(gone_path)
+                        changed.discard(gone_path)
+            elif mask & Inotify.IN_ISDIR:
+                if name == '.git' or self.scanner._ignored(rel_path, True, rules):
+                    continue
+                stats: Dict[str, Tuple[int, int]] = {}
+                known_dirs = set(self.scanner.dirs)
+                for _ in self.scanner.scan(stats=stats, start=(path, rel_path + '/', rules)):
+                    pass
+                self._watch_dirs(set(self.scanner.dirs) - known_dirs)
+                if not self.inotify:
+                    return self._rescan()  # Fell back to rescans; the rest of the events may be incomplete
+                changed.update(stats)
+                deleted.difference_update(stats)
+                self.stats.update(stats)
+            elif self.scanner.wanted(path, rel_path, rules):
                 try:
-                    for _ in tqdm(range(interval), desc="Time until next commit"):
-                        time.sleep(1)
-                    self.state.current_wait_until = None
-                    self.state.save()
-                except KeyboardInterrupt:
-                    print("\nPaused. Resume by running the script again.")
-                    self.state.save()
-                    raise
-        except KeyboardInterrupt:
-            print("\nPaused. Resume by running the script again.")
-            self.state.save()
-        except Exception as e:
-            print(f"\nError: {e}")
-            self.state.save()
-            raise
-    def __init__(self, project_folder: str, github_token: str, repo_name: str, state_file: Optional[str] = None):
-        self.project_folder = Path(project_folder).resolve()
-        self.github_token = github_token
-        self.repo_name = repo_name
-        self.state_file = Path(state_file or self.project_folder / ".commit_state.json").resolve()
-        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if self.stats.get(rel_path) != (st.st_size, st.st_mtime_ns):
+                    self.stats[rel_path] = (st.st_size, st.st_mtime_ns)
+                    changed.add(rel_path)
+                    deleted.discard(rel_path)
+        return changed, deleted
+
+    def changes(self, timeout: Optional[float] = 0) -> Tuple[Set[str], Set[str]]:
+        """Returns the (changed, deleted) relative paths seen since the last call.
+
+        timeout is how long to wait for a change; None waits until there is one.
+        """
+        while True:
+            if self.inotify:
+                changed, deleted = self._apply_events(self.inotify.read(timeout))
+            else:
+                due = self.last_scan + self.config.watch_interval - time.monotonic()
+                if due > 0 and timeout is not None and timeout < due:
+                    time.sleep(timeout)
+                    return set(), set()
+                time.sleep(max(0.0, due))
+                changed, deleted = self._rescan()
+            if changed or deleted or timeout is not None:
+                return ({p.replace('/', os.sep) for p in changed}, {p.replace('/', os.sep) for p in deleted})
+
+    async def wait_async(self, timeout: Optional[float] = None) -> Tuple[Set[str], Set[str]]:
+        """Waits on the event loop until something changed and returns it, like changes(timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if self.inotify:
+                ready = asyncio.Event()
+                loop = asyncio.get_running_loop()
+                loop.add_reader(self.inotify.fd, ready.set)
+                try:
+                    await asyncio.wait_for(ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    loop.remove_reader(self.inotify.fd)
+            else:
+                due = max(0.0, self.last_scan + self.config.watch_interval - time.monotonic())
+                await asyncio.sleep(due if remaining is None else min(due, remaining))
+            changed, deleted = self.changes()
+            if changed or deleted or (deadline is not None and time.monotonic() >= deadline):
+                return changed, deleted
+
+
+def parse_units(content: str) -> List[list]:
+    """Finds the functions, async functions and classes in Python source.
+
+    Returns [start, end, label] per definition, with start and end the character offsets of the
+    whole lines it spans, decorators included, and labels like 'method foo' or 'class Foo'. The
+    offsets come from one index of line starts, using the same line breaks as the parser. Plain
+    functions come first in ast.walk order, so their indices match manifests from before async
+    functions and classes were committed.
+    """
+    line_starts = [0] + [match.end() for match in re.finditer(r'\r\n|\r|\n', content)] + [len(content)]
+    units: Dict[type, List[list]] = {ast.FunctionDef: [], ast.AsyncFunctionDef: [], ast.ClassDef: []}
+    for node in ast.walk(ast.parse(content)):
+        if type(node) in units:
+            first = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            kind = 'class' if isinstance(node, ast.ClassDef) else 'method'
+            units[type(node)].append([line_starts[first - 1], line_starts[node.end_lineno], f"{kind} {node.name}"])
+    return [unit for group in units.values() for unit in group]
+
+
+def _parse_file(path: str) -> Tuple[str, int, int, str, Optional[List[list]]]:
+    """Reads and parses one file in a parse worker; units is None if the file cannot be parsed."""
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        raw = f.read()
+    try:
+        units = parse_units(raw.decode('utf-8'))
+    except (UnicodeDecodeError, SyntaxError, ValueError):
+        units = None  # Reported when the committer gets to the file
+    return path, st.st_size, st.st_mtime_ns, hashlib.sha1(raw).hexdigest(), units
+
+
+class MethodManifest:
+    """Caches method boundaries per file so each unchanged file is parsed once per job."""
+
+    VERSION = 2  # 2: character offsets, decorators, async functions and classes
+
     def __init__(self, config: Config):
         self.config = config
-        self.completed_files: set = set()
-        self.partial_methods: Dict[str, List[int]] = {}  # Maps files to committed method indices
-        self.current_wait_until: Optional[datetime] = None
-        self.start_time = datetime.now()
-        self.first_run = True
+        self.entries: Dict[str, dict] = {}  # rel_path -> {size, mtime_ns, sha1, methods: [[start, end, label]]}
+        self.dirty = False
+
     def load(self) -> None:
-        """Loads state from file if it exists."""
-        if not self.config.state_file.exists():
+        """Loads the manifest from disk if it exists and matches the current format."""
+        if not self.config.manifest_file.exists():
             return
         try:
-            with open(self.config.state_file, 'r', encoding='utf-8') as f:
+            with open(self.config.manifest_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                self.completed_files = set(data.get('completed_files', []))
-                self.partial_methods = {k: [int(i) for i in v] for k, v in data.get('partial_methods', {}).items()}
-                if wait_ts := data.get('current_wait_until'):
-                    self.current_wait_until = datetime.fromtimestamp(wait_ts)
-                if start_ts := data.get('start_time'):
-                    self.start_time = datetime.fromtimestamp(start_ts)
-                    self.first_run = False
-            print(f"Loaded state: {len(self.completed_files)} completed files")
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('files', {})
+            print(f"Loaded manifest: {len(self.entries)} parsed files")
         except Exception as e:
-            print(f"Error loading state: {e}, starting fresh")
+            print(f"Error loading manifest: {e}, reparsing files")
+
     def save(self) -> None:
-        """Saves state to file."""
+        """Writes the manifest atomically if any entry changed."""
+        if not self.dirty:
+            return
         try:
-            data = {
-                'completed_files': list(self.completed_files),
-                'partial_methods': self.partial_methods,
-                'start_time': self.start_time.timestamp(),
-                'current_wait_until': self.current_wait_until.timestamp() if self.current_wait_until else None
-            }
-            with open(self.config.state_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
-            print(f"State saved at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            _dump_json_atomically(self.config.manifest_file, {'version': self.VERSION, 'files': self.entries},
+                                  separators=(',', ':'))
+            self.dirty = False
         except Exception as e:
-            print(f"Error saving state: {e}")
-    def __init__(self, config: Config):
+            print(f"Error saving manifest: {e}")
+
+    def lookup(self, rel_path: str, st: os.stat_result, raw: bytes) -> Optional[List[list]]:
+        """Returns cached boundaries if the file is unchanged, checking the hash only when stat data differs."""
+        entry = self.entries.get(rel_path)
+        if not entry or entry['size'] != st.st_size:
+            return None
+        if entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['methods']
+        if entry['sha1'] != hashlib.sha1(raw).hexdigest():
+            return None
+        entry['mtime_ns'] = st.st_mtime_ns
+        self.dirty = True
+        return entry['methods']
+
+    def is_fresh(self, rel_path: str, st: os.stat_result) -> bool:
+        """Returns True if the file has an entry and its size and mtime did not change."""
+        entry = self.entries.get(rel_path)
+        return bool(entry) and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns
+
+    def store(self, rel_path: str, st: os.stat_result, raw: bytes, methods: List[list]) -> None:
+        """Records freshly parsed boundaries for a file."""
+        self.store_parsed(rel_path, st.st_size, st.st_mtime_ns, hashlib.sha1(raw).hexdigest(), methods)
+
+    def store_parsed(self, rel_path: str, size: int, mtime_ns: int, sha1: str, methods: List[list]) -> None:
+        """Records boundaries parsed elsewhere, e.g. in a parse worker."""
+        self.entries[rel_path] = {'size': size, 'mtime_ns': mtime_ns, 'sha1': sha1, 'methods': methods}
+        self.dirty = True
+
+    def remove(self) -> None:
+        """Deletes the manifest file once the job is finished."""
+        self.entries = {}
+        self.dirty = False
+        if self.config.manifest_file.exists():
+            os.remove(self.config.manifest_file)
+
+
+class PushTransport:
+    """Pushes to one git remote, retrying failed pushes with exponential backoff and jitter."""
+
+    MAX_BACKOFF = 60.0  # Seconds; the longest wait between two attempts
+
+    def __init__(self, repo: git.Repo, remote: str, config: Config, metrics: Metrics):
+        self.repo = repo
+        self.remote = remote
         self.config = config
-        self.repo = self._init_repo()
+        self.metrics = metrics
+        self.rng = random.Random()
+
+    @property
+    def target(self) -> str:
+        """What git push and fetch are given: the remote's name."""
+        return self.remote
+
+    def _git(self, *args: str) -> Tuple[int, str, str]:
+        """Runs git in a process group of its own and returns (exit code, stdout, stderr).
+
+        Once --push-timeout passes, the whole group is killed, transport helpers and hooks of local
+        remotes included; killing git alone would leave them holding its output open.
+        """
+        proc = subprocess.Popen(['git', *args], cwd=self.repo.working_dir, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace',
+                                start_new_session=True)
         try:
-            self.github = Github(config.github_token)
-            owner, repo_name = config.repo_name.split('/')
-            self.github_repo = self.github.get_user(owner).get_repo(repo_name)
-            print(f"Connected to GitHub repo: {config.repo_name}")
-        except GithubException as e:
-            print(f"Error connecting to GitHub: {e}")
-            raise SystemExit(1)
+            out, err = proc.communicate(timeout=self.config.push_timeout or None)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            out, _ = proc.communicate()
+            return -1, out, f"git {args[0]} timed out after {self.config.push_timeout:g}s"
+        return proc.returncode, out, err
+
+    def push_once(self, refspecs: Sequence[str], lease: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """Pushes once; returns (rejected, error) where rejected means the branch moved on and error is None on success.
+
+        lease is a ref:sha pair: the push may then replace the remote branch if it still points at sha.
+        """
+        args = [f'--force-with-lease={lease}'] if lease else []
+        try:
+            code, out, err = self._git('push', '--porcelain', *args, self.target, *refspecs)
+        except OSError as e:
+            return False, str(e)
+        if code == 0:
+            return False, None
+        # Porcelain lines are "flag<TAB>from:to<TAB>summary"; '!' marks refs that were not updated
+        failed = [line.split('\t')[-1] for line in out.splitlines() if line.startswith('!')]
+        return '[rejected]' in out, '; '.join(failed) or err.strip() or f"git push exited with {code}"
+
+    def fetch(self, ref: str) -> str:
+        """Fetches a branch of the remote and returns the sha it points at."""
+        code, _, err = self._git('fetch', self.target, ref)
+        if code:
+            raise git.GitCommandError(['git', 'fetch', self.target, ref], code, err)
+        return self.repo.git.rev_parse('FETCH_HEAD')
+
+    def backoff(self, attempt: int) -> float:
+        """Seconds to wait before retry number attempt (from 0): doubling each time, half of it random."""
+        delay = min(self.MAX_BACKOFF, self.config.push_backoff * 2 ** attempt)
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def push(self, refspecs: Sequence[str] = (), lease: Optional[str] = None,
+             on_rejected: Optional[Callable[[], bool]] = None, slots=None) -> Optional[str]:
+        """Pushes, retrying up to --push-retries times; returns why the last attempt failed, or None.
+
+        A rejected push is retried straight away if on_rejected (fetch and rebase) returns True,
+        and given up otherwise. Other failures are retried after a backoff. slots, the
+        orchestrator's push cap, is held for each attempt but not while backing off.
+        """
+        error = None
+        for attempt in range(self.config.push_retries + 1):
+            with slots or contextlib.nullcontext():
+                rejected, error = self.push_once(refspecs, lease)
+            if error is None:
+                return None
+            if rejected:
+                if on_rejected is None or not on_rejected():
+                    return error
+            elif attempt < self.config.push_retries:
+                delay = self.backoff(attempt)
+                print(f"Push to {self.remote} failed ({error.strip().splitlines()[-1]}), retrying in {delay:.1f}s")
+                with self.metrics.phase('push_backoff'):
+                    time.sleep(delay)
+        return error
+
+
+class LocalRemote(PushTransport):
+    """Stand-in for a remote: a local bare repository, so the whole push path runs offline.
+
+    The repository is created on first use. With --stand-in-failures, that share of pushes
+    fails before reaching it or, for the primary remote, finds a commit from someone else on the
+    branch, so retries and rejected-push recovery run as they would against a busy remote.
+    """
+
+    def __init__(self, repo: git.Repo, remote: str, config: Config, metrics: Metrics, path: Path):
+        super().__init__(repo, remote, config, metrics)
+        self.path = path
+        if not path.exists():
+            git.Repo.init(path, bare=True)
+
+    @property
+    def target(self) -> str:
+        return str(self.path)
+
+    def _add_foreign_commit(self, ref: str) -> None:
+        """Moves the stand-in's branch on by a commit of its own, keeping the tree."""
+        bare = git.Repo(self.path)
+        try:
+            tip = bare.commit(ref)
+        except (git.BadName, ValueError):
+            return  # The branch does not exist there yet
+        foreign = git.Commit.create_from_tree(bare, tip.tree, "Commit pushed by someone else (stand-in)",
+                                              parent_commits=[tip], author=git.Actor('Stand-in', 'stand-in@localhost'))
+        bare.git.update_ref(ref, foreign.hexsha, tip.hexsha)
+
+    def push_once(self, refspecs: Sequence[str], lease: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        if not refspecs:
+            ref = self.repo.head.ref.path
+            refspecs = [f'{ref}:{ref}']
+        roll = self.rng.random()
+        if roll < self.config.stand_in_failures / 2:
+            return False, "simulated network failure"
+        if roll < self.config.stand_in_failures and self.remote == self.config.remotes[0]:
+            self._add_foreign_commit(refspecs[0].split(':')[-1])
+        return super().push_once(refspecs, lease)
+
+
+class GitHandler:
+    """Handles Git and GitHub operations."""
+
+    def __init__(self, config: Config, state: Optional[State] = None, metrics: Optional[Metrics] = None):
+        self.config = config
+        self.state = state or State.create(config)
+        self.metrics = metrics or Metrics(config)
+        self.last_push = time.monotonic()
+        self.auto_flush = not config.pipeline  # The asyncio pipeline pushes in the background itself
+        self.push_slots = None  # Semaphore shared by orchestrated jobs to cap concurrent pushes
+        self.mirror_slots = None  # ...and one of their own for mirror pushes, so these cannot starve primaries
+        self.mirrors = config.remotes[1:]
+        self.mirror_pool = ThreadPoolExecutor(max_workers=len(self.mirrors)) if self.mirrors else None
+        self.mirror_pushes: Dict[str, Future] = {}  # Mirror -> its push in flight
+        self.maintenance_pool = ThreadPoolExecutor(max_workers=1)
+        self.commits_since_graph = 0  # Commits made since the commit-graph was last written
+        self.index_entries: Dict[str, Tuple[int, str]] = {}  # Path -> (mode, blob sha) committed, not yet indexed
+        self.repo = self._init_repo()
+        self.transports: Dict[str, PushTransport] = {remote: self._transport(remote) for remote in config.remotes}
+        self._github_repo = None
+        if not config.github_token:
+            print("No GitHub token given, pushing without the GitHub API")
+
     def _init_repo(self) -> git.Repo:
         """Initializes the Git repository."""
         try:
             repo = git.Repo(self.config.project_folder)
-            origin = repo.remote(name='origin')
-            print(f"Using git repo at {self.config.project_folder}, remote: {origin.url}")
+            primary, *mirrors = self.config.remotes
+            if self.config.stand_in:
+                where = f"stand-in repositories in {self.config.stand_in}"
+            else:
+                where = f"remote: {repo.remote(name=primary).url}"
+                for mirror in mirrors:
+                    repo.remote(name=mirror)
+            print(f"Using git repo at {self.config.project_folder}, {where}"
+                  + (f", mirrors: {', '.join(mirrors)}" if mirrors else ""))
             return repo
         except Exception as e:
             print(f"Error initializing repo: {e}")
             raise SystemExit(1)
-    def commit_and_push(self, file_path: Path, message: str) -> bool:
-        """Commits and pushes a file with the given message."""
-        rel_path = str(file_path.relative_to(self.config.project_folder))
+
+    def _transport(self, remote: str) -> PushTransport:
+        if self.config.stand_in:
+            return LocalRemote(self.repo, remote, self.config, self.metrics, self.config.stand_in / f'{remote}.git')
+        return PushTransport(self.repo, remote, self.config, self.metrics)
+
+    @property
+    def github_repo(self):
+        """The GitHub repository, connected on first use; None without a token or if it is unreachable."""
+        if self._github_repo is None and self.config.github_token:
+            if Github is None:
+                print("PyGithub is not installed, the GitHub API is not available")
+                return None
+            try:
+                owner, repo_name = self.config.repo_name.split('/')
+                self._github_repo = Github(self.config.github_token).get_user(owner).get_repo(repo_name)
+                print(f"Connected to GitHub repo: {self.config.repo_name}")
+            except (GithubException, ValueError) as e:
+                print(f"Error connecting to GitHub: {e}")
+        return self._github_repo
+
+    @staticmethod
+    def _commit_dates(when: Optional[int]) -> dict:
+        """Author and committer date arguments for a commit dated at a unix time, in the local zone."""
+        if when is None:
+            return {}
+        date = datetime.fromtimestamp(when).astimezone()
+        return {'author_date': date, 'commit_date': date}
+
+    def commit_and_push(self, file_paths: Sequence[Path], message: str, when: Optional[int] = None) -> bool:
+        """Commits files with the given message and pushes once a batch is due.
+
+        when backdates the commit to a unix time; by default it is dated now.
+        """
+        label = ', '.join(str(p.relative_to(self.config.project_folder)) for p in file_paths)
         try:
-            if not file_path.exists():
-                print(f"File not found: {rel_path}")
+            missing = [str(p.relative_to(self.config.project_folder)) for p in file_paths if not p.exists()]
+            if missing:
+                print(f"File not found: {', '.join(missing)}")
                 return False
-            self.repo.git.add(str(file_path))
-            if not self.repo.is_dirty(path=str(file_path)):
-                print(f"No changes to commit for {rel_path}")
+            paths = [str(p) for p in file_paths]
+            self._sync_index()
+            with self.metrics.phase('git_add'):
+                self.repo.git.add(*paths)
+            with self.metrics.phase('is_dirty'):
+                # One diff of the index against HEAD for all paths, as is_dirty() runs per path
+                dirty = bool(self.repo.git.diff('--cached', '--name-only', '--', *paths))
+            if not dirty:
+                print(f"No changes to commit for {label}")
                 return True
-            self.repo.index.commit(message)
-            self.repo.remote(name='origin').push()
-            print(f"Committed and pushed: {rel_path}")
+            with self.metrics.phase('commit'):
+                commit = self.repo.index.commit(message, **self._commit_dates(when))
+            self.state.add_unpushed(commit.hexsha)
+            self.commits_since_graph += 1
+            print(f"Committed: {label}")
+            if self.auto_flush:
+                self.maybe_flush()
             return True
-        except GithubException as e:
-            print(f"GitHub error for {rel_path}: {e}")
+        except Exception as e:
+            print(f"Error committing {label}: {e}")
+            return False
+
+    def commit_content(self, files: Sequence[Tuple[Path, Optional[bytes]]], message: str,
+                       when: Optional[int] = None) -> bool:
+        """Commits new content for files straight into the object database.
+
+        Each file gets the given bytes, or with None its content on disk, streamed into the blob.
+        The blobs, the trees along their paths and the commit are written with GitPython's object
+        database and the current branch is advanced. The working tree is not touched; the index
+        entries of the committed paths are pointed at the new blobs by the next flush or worktree
+        commit (see _sync_index), so that a later commit made from the index keeps them.
+        """
+        rel_paths = [str(file_path.relative_to(self.config.project_folder)) for file_path, _ in files]
+        label = ', '.join(rel_paths)
+        try:
+            with self.metrics.phase('commit'):
+                parent = self.repo.head.commit if self.repo.head.is_valid() else None
+                parent_tree = parent.tree.binsha if parent else None
+                blobs: Dict[str, List[Tuple[bytes, int, str]]] = {}  # Folder -> new (sha, mode, name) entries
+                indexed = {}
+                for (file_path, data), rel_path in zip(files, rel_paths):
+                    mode = stat.S_IFREG | (0o755 if file_path.exists() and os.access(file_path, os.X_OK) else 0o644)
+                    blob_sha = self._store_file(file_path) if data is None else self._store_object(b'blob', data)
+                    folder, _, name = rel_path.replace(os.sep, '/').rpartition('/')
+                    blobs.setdefault(folder, []).append((blob_sha, mode, name))
+                    indexed[rel_path.replace(os.sep, '/')] = (mode, blob_sha.hex())
+                tree_sha = parent_tree
+                for folder, entries in blobs.items():
+                    tree_sha = self._write_tree(tree_sha, folder.split('/') if folder else [], entries)
+                if tree_sha == parent_tree:
+                    print(f"No changes to commit for {label}")
+                    return True
+                commit = git.Commit.create_from_tree(self.repo, git.Tree(self.repo, tree_sha), message,
+                                                     parent_commits=[parent] if parent else [], head=True,
+                                                     **self._commit_dates(when))
+            self.index_entries.update(indexed)
+            self.state.add_unpushed(commit.hexsha)
+            self.commits_since_graph += 1
+            print(f"Committed: {label}")
+            if self.auto_flush:
+                self.maybe_flush()
+            return True
+        except Exception as e:
+            print(f"Error committing {label}: {e}")
+            return False
+
+    def _sync_index(self) -> None:
+        """Points the index at the blobs commit_content committed since the last call, in one update-index.
+
+        Batching keeps a git process off every commit. It runs before anything reads the index: a
+        worktree commit, and every flush, so the index is in step when the job pauses or ends.
+        """
+        if not self.index_entries:
+            return
+        entries, self.index_entries = self.index_entries, {}
+        info = b''.join(f"{mode:o} {sha}\t{path}\0".encode('utf-8') for path, (mode, sha) in entries.items())
+        with self.metrics.phase('index'):
+            result = subprocess.run(['git', 'update-index', '-z', '--index-info'], cwd=self.repo.working_tree_dir,
+                                    input=info, capture_output=True)
+        if result.returncode:
+            error = result.stderr.decode('utf-8', 'replace').strip()
+            print(f"Warning: could not update the index for {len(entries)} file(s), run `git read-tree HEAD`: {error}")
+
+    def _store_object(self, obj_type: bytes, data: bytes) -> bytes:
+        return self.repo.odb.store(IStream(obj_type, len(data), BytesIO(data))).binsha
+
+    def _store_file(self, file_path: Path) -> bytes:
+        """Stores a file as a blob, hashed and compressed in chunks rather than read into memory whole."""
+        with open(file_path, 'rb') as f:
+            return self.repo.odb.store(IStream(b'blob', os.fstat(f.fileno()).st_size, f)).binsha
+
+    def _write_tree(self, tree_sha: Optional[bytes], parts: List[str], blobs: List[Tuple[bytes, int, str]]) -> bytes:
+        """Writes a copy of tree_sha with blobs placed in the folder at parts, returning the new tree's sha."""
+        entries = tree_entries_from_data(self.repo.odb.stream(tree_sha).read()) if tree_sha else []
+        if parts:
+            subtree = next((sha for sha, m, n in entries if n == parts[0] and m == stat.S_IFDIR), None)
+            new_entries = [(self._write_tree(subtree, parts[1:], blobs), stat.S_IFDIR, parts[0])]
+        else:
+            new_entries = blobs
+        names = {name for _, _, name in new_entries}
+        entries = [e for e in entries if e[2] not in names] + new_entries
+        # Git orders tree entries bytewise, comparing directories as if their name ended in '/'
+        entries.sort(key=lambda e: (e[2] + '/' if e[1] == stat.S_IFDIR else e[2]).encode('utf-8'))
+        stream = BytesIO()
+        tree_to_stream(entries, stream.write)
+        return self._store_object(b'tree', stream.getvalue())
+
+    def _object_counts(self) -> Tuple[int, int]:
+        """Returns the number of loose objects and of packs, read from the object directory like `git count-objects`."""
+        objects = os.path.join(self.repo.common_dir, 'objects')
+        loose = 0
+        with os.scandir(objects) as entries:
+            for entry in entries:
+                if len(entry.name) == 2 and entry.is_dir():
+                    loose += len(os.listdir(entry.path))
+        try:
+            packs = sum(name.endswith('.pack') for name in os.listdir(os.path.join(objects, 'pack')))
+        except OSError:
+            packs = 0
+        return loose, packs
+
+    def maintenance_due(self) -> List[str]:
+        """Returns the maintenance tasks whose threshold is reached, in the order they should run."""
+        tasks = []
+        loose, packs = self._object_counts()
+        if self.config.maintenance_loose and loose >= self.config.maintenance_loose:
+            tasks.append('repack')
+            packs += 1
+        if self.config.maintenance_packs and packs >= self.config.maintenance_packs:
+            tasks.append('multi_pack_index')
+        if self.config.maintenance_commits and self.commits_since_graph >= self.config.maintenance_commits:
+            tasks.append('commit_graph')
+        return tasks
+
+    def maintain(self, tasks: Optional[List[str]] = None) -> None:
+        """Runs the given or the due maintenance tasks, each timed as a phase of its own.
+
+        repack packs loose objects into one new pack without touching existing packs.
+        multi_pack_index indexes all packs, drops packs whose objects all moved, and combines the
+        packs other than the largest into one. commit_graph adds a layer to the split commit-graph.
+        """
+        tasks = self.maintenance_due() if tasks is None else tasks
+        if not tasks:
+            return
+        start = time.perf_counter()
+        for task in tasks:
+            try:
+                with self.metrics.phase(task):
+                    if task == 'repack':
+                        self.repo.git.repack('-d', '-q')
+                    elif task == 'multi_pack_index':
+                        pack_dir = os.path.join(self.repo.common_dir, 'objects', 'pack')
+                        sizes = sorted(os.path.getsize(os.path.join(pack_dir, name))
+                                       for name in os.listdir(pack_dir) if name.endswith('.pack'))
+                        self.repo.git.multi_pack_index('write')
+                        self.repo.git.multi_pack_index('expire')
+                        self.repo.git.multi_pack_index('repack', f'--batch-size={sum(sizes[:-1]) + 1}')
+                    else:
+                        self.commits_since_graph = 0
+                        self.repo.git.commit_graph('write', '--reachable', '--split')
+            except (git.GitCommandError, OSError) as e:
+                print(f"Maintenance task {task} failed: {e}")
+        print(f"Maintenance: {', '.join(tasks)} in {time.perf_counter() - start:.2f}s")
+
+    def start_maintenance(self) -> Optional[Future]:
+        """Starts the due maintenance tasks in the background, e.g. for the length of a wait."""
+        tasks = self.maintenance_due()
+        return self.maintenance_pool.submit(self.maintain, tasks) if tasks else None
+
+    def push_due(self) -> bool:
+        """Returns True when the unpushed batch hit the commit count or time limit."""
+        pending = len(self.state.unpushed_commits)
+        if not pending:
             return False
+        if pending >= self.config.push_every:
+            return True
+        return bool(self.config.push_interval) and time.monotonic() - self.last_push >= self.config.push_interval
+
+    def maybe_flush(self) -> bool:
+        """Pushes the pending batch if it is due."""
+        return self.flush() if self.push_due() else True
+
+    def _replay(self, commit: git.Commit, onto: git.Commit) -> git.Commit:
+        """Recreates a commit on top of another, with the files it changed and its message, author and dates."""
+        raw = self.repo.git.diff_tree('-r', '-z', '--no-commit-id', commit.parents[0].hexsha, commit.hexsha)
+        fields = raw.rstrip('\0').split('\0') if raw else []
+        blobs: Dict[str, List[Tuple[bytes, int, str]]] = {}  # Folder -> (sha, mode, name) entries
+        for info, path in zip(fields[0::2], fields[1::2]):
+            _, mode, _, sha, status = info.split(' ')
+            if status == 'D':
+                raise ValueError(f"cannot replay the deletion of {path}")
+            folder, _, name = path.rpartition('/')
+            blobs.setdefault(folder, []).append((bytes.fromhex(sha), int(mode, 8), name))
+        tree_sha = onto.tree.binsha
+        for folder, entries in blobs.items():
+            tree_sha = self._write_tree(tree_sha, folder.split('/') if folder else [], entries)
+        return git.Commit.create_from_tree(self.repo, git.Tree(self.repo, tree_sha), commit.message,
+                                           parent_commits=[onto], author=commit.author, committer=commit.committer,
+                                           author_date=commit.authored_datetime, commit_date=commit.committed_datetime)
+
+    def _rebase_onto_remote(self, transport: PushTransport) -> bool:
+        """Recovers from a rejected push: fetches the remote branch and replays our commits on top of it.
+
+        Our commits only add or change files, so each is recreated on the remote's tree with the
+        files it changed, our version winning where both sides changed a file. Returns False if
+        that is not possible, e.g. when the history since the common ancestor is not linear.
+        """
+        ref = self.repo.head.ref
+        try:
+            with self.metrics.phase('rebase'):
+                head = ref.commit
+                remote_tip = self.repo.commit(transport.fetch(ref.path))
+                bases = self.repo.merge_base(head, remote_tip)
+                if not bases:
+                    print(f"Cannot rebase onto {transport.remote}: no common history")
+                    return False
+                ours = list(self.repo.iter_commits(f'{bases[0].hexsha}..{head.hexsha}', reverse=True))
+                if any(len(commit.parents) != 1 for commit in ours):
+                    print(f"Cannot rebase onto {transport.remote}: our commits include merges")
+                    return False
+                tip = remote_tip
+                replayed = []
+                for commit in ours:
+                    tip = self._replay(commit, tip)
+                    replayed.append(tip.hexsha)
+                ref.set_commit(tip, logmsg=f"rebase onto {transport.remote} after a rejected push")
+                self.repo.git.read_tree(tip.hexsha)  # Later commits of any engine must not revert the remote's files
         except Exception as e:
-            print(f"Error committing {rel_path}: {e}")
+            print(f"Cannot rebase onto {transport.remote}: {e}")
             return False
+        self.state.clear_unpushed()
+        for sha in replayed:
+            self.state.add_unpushed(sha)
+        print(f"Push to {transport.remote} was rejected, rebased {len(replayed)} commit(s) onto its branch")
+        return True
+
+    def _push_mirror(self, remote: str, refspec: str, sha: str, lease: Optional[str]) -> Tuple[str, Optional[str]]:
+        with self.metrics.phase('push_mirror'):
+            return sha, self.transports[remote].push([refspec], lease, slots=self.mirror_slots)
+
+    def _collect_mirrors(self, wait: bool = False) -> None:
+        """Records finished mirror pushes in the state; with wait, waits for the ones in flight first."""
+        for remote, future in list(self.mirror_pushes.items()):
+            if not (wait or future.done()):
+                continue
+            del self.mirror_pushes[remote]
+            sha, error = future.result()
+            if error:
+                print(f"Error pushing to mirror {remote}: {error}, retrying with the next push")
+            else:
+                self.state.set_remote_head(remote, sha)
+                print(f"Pushed to mirror {remote}")
+
+    def _sync_mirrors(self) -> None:
+        """Starts a push of the branch to every mirror that is behind it and has no push in flight.
+
+        A push sends everything the mirror is missing, so one that was slow or failing catches up
+        in a single push rather than replaying each batch. It may replace the mirror's branch if
+        that still is what we pushed last, as after our commits were rebased for the primary.
+        """
+        self._collect_mirrors()
+        if not self.mirrors or not self.repo.head.is_valid():
+            return
+        sha, ref = self.repo.head.commit.hexsha, self.repo.head.ref.path
+        for remote in self.mirrors:
+            known = self.state.remote_heads.get(remote)
+            if remote not in self.mirror_pushes and known != sha:
+                lease = f'{ref}:{known}' if known else None
+                # Push that exact commit, so the state records what the mirror has even if HEAD moves on
+                self.mirror_pushes[remote] = self.mirror_pool.submit(self._push_mirror, remote, f'{sha}:{ref}',
+                                                                     sha, lease)
+
+    def sync_mirrors(self) -> bool:
+        """Records finished mirror pushes and starts the ones due; returns True while any is in flight."""
+        self._sync_mirrors()
+        return bool(self.mirror_pushes)
+
+    def flush(self, wait: bool = False) -> bool:
+        """Pushes all local commits that have not reached the primary remote yet.
+
+        Mirrors are pushed at the same time on a thread pool, and the primary push does not wait
+        for them. With wait, as on exit, it also waits until every mirror is pushed or failed and
+        returns False if one is still behind.
+        """
+        self._sync_index()
+        self._sync_mirrors()
+        pending = len(self.state.unpushed_commits)
+        flushed = True
+        if pending:
+            transport = self.transports[self.config.remotes[0]]
+            with self.metrics.phase('push'):
+                error = transport.push(on_rejected=lambda: self._rebase_onto_remote(transport), slots=self.push_slots)
+            if error:
+                print(f"Error pushing {pending} commit(s) to {self.config.remotes[0]}: {error}")
+                flushed = False
+            else:
+                self.state.clear_unpushed()
+                self.last_push = time.monotonic()
+                print(f"Pushed {pending} commit(s)")
+        if wait and self.mirrors and self.repo.head.is_valid():
+            self._collect_mirrors(wait=True)
+            self._sync_mirrors()  # Mirrors whose push in flight started before the last commit
+            self._collect_mirrors(wait=True)
+            behind = [m for m in self.mirrors if self.state.remote_heads.get(m) != self.repo.head.commit.hexsha]
+            if behind:
+                print(f"Mirrors not up to date: {', '.join(behind)}")
+                flushed = False
+        return flushed
+
+
+class FastImportStream:
+    """Feeds blobs and commits for one branch to a single `git fast-import` process."""
+
+    CHUNK_SIZE = 1 << 20  # Files are copied into the stream in pieces of this size
+
+    def __init__(self, repo_dir: Path, ref: str, parent: Optional[str], author: git.Actor):
+        self.ref = ref
+        self.parent = parent
+        self.ident = f"{author.name} <{author.email}>".encode('utf-8')
+        self.tz = time.strftime('%z').encode('ascii') or b'+0000'
+        self.next_mark = 1
+        self.commits = 0
+        self.proc = subprocess.Popen(['git', 'fast-import', '--quiet', '--done'], cwd=repo_dir,
+                                     stdin=subprocess.PIPE)
+        self.out = self.proc.stdin
+
+    @staticmethod
+    def _quote(path: str) -> bytes:
+        if path.startswith('"') or '\n' in path:
+            path = '"' + path.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        return path.encode('utf-8')
+
+    def _data(self, data: bytes) -> None:
+        self.out.write(b'data %d\n' % len(data))
+        self.out.write(data)
+        self.out.write(b'\n')
+
+    def blob(self, data: bytes) -> int:
+        """Writes a blob and returns its mark."""
+        mark = self.next_mark
+        self.next_mark += 1
+        self.out.write(b'blob\nmark :%d\n' % mark)
+        self._data(data)
+        return mark
+
+    def blob_file(self, file_path: Path) -> Tuple[int, str]:
+        """Streams a file into a blob without reading it whole; returns its mark and blob sha."""
+        mark = self.next_mark
+        self.next_mark += 1
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            sha = hashlib.sha1(b'blob %d\0' % size)
+            self.out.write(b'blob\nmark :%d\ndata %d\n' % (mark, size))
+            left = size
+            while left:
+                chunk = f.read(min(left, self.CHUNK_SIZE))
+                if not chunk:
+                    raise OSError(f"{file_path} shrank while it was read")
+                sha.update(chunk)
+                self.out.write(chunk)
+                left -= len(chunk)
+        self.out.write(b'\n')
+        return mark, sha.hexdigest()
+
+    def commit(self, changes: Sequence[Tuple[str, int, int]], message: str, timestamp: int) -> None:
+        """Writes a commit that sets each (path, blob mark, mode) of changes to a previously written blob."""
+        when = b'%d %s' % (timestamp, self.tz)
+        self.out.write(b'commit %s\n' % self.ref.encode('utf-8'))
+        self.out.write(b'author %s %s\ncommitter %s %s\n' % (self.ident, when, self.ident, when))
+        self._data(message.encode('utf-8'))
+        if self.commits == 0 and self.parent:
+            self.out.write(b'from %s\n' % self.parent.encode('ascii'))
+        for path, blob_mark, mode in changes:
+            self.out.write(b'M %o :%d %s\n' % (mode, blob_mark, self._quote(path.replace(os.sep, '/'))))
+        self.out.write(b'\n')
+        self.commits += 1
+
+    def close(self) -> bool:
+        """Finishes the stream and returns True if fast-import accepted it."""
+        try:
+            self.out.write(b'done\n')
+            self.out.close()
+        except BrokenPipeError:
+            pass
+        return self.proc.wait() == 0
+
+
+class IndexedSet:
+    """Set with O(1) add, discard and uniform random choice."""
+
+    def __init__(self, items: Iterable = ()):
+        self.items: list = []
+        self.positions: dict = {}  # Item -> index in self.items
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item) -> bool:
+        return item in self.positions
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def add(self, item) -> None:
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item) -> None:
+        """Removes an item by moving the last element into its slot."""
+        pos = self.positions.pop(item, None)
+        if pos is None:
+            return
+        last = self.items.pop()
+        if pos < len(self.items):
+            self.items[pos] = last
+            self.positions[last] = pos
+
+    def choice(self, rng: Optional[random.Random] = None):
+        return (rng or random).choice(self.items)
+
+
+class PathTable:
+    """Relative paths addressed by integer id.
+
+    Paths are interned, so the state and plan share these strings instead of holding copies.
+    The paths given up front get ids in sorted order; paths added later are appended.
+    """
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self.paths: List[str] = sorted(map(sys.intern, paths))  # Id -> path; ids of removed paths are not reused
+        self.ids: Dict[str, int] = {path: idx for idx, path in enumerate(self.paths)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, rel_path: str) -> bool:
+        return rel_path in self.ids
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def get(self, rel_path: str) -> Optional[int]:
+        return self.ids.get(rel_path)
+
+    def add(self, rel_path: str) -> int:
+        """Returns the id of a path, giving it the next free id if it is new."""
+        idx = self.ids.get(rel_path)
+        if idx is None:
+            idx = self.ids[rel_path] = len(self.paths)
+            self.paths.append(sys.intern(rel_path))
+        return idx
+
+    def discard(self, rel_path: str) -> None:
+        self.ids.pop(rel_path, None)
+
+
+class PathSet:
+    """IndexedSet of paths from a PathTable, held as ids in two int arrays instead of a list and a dict."""
+
+    def __init__(self, table: PathTable):
+        self.table = table
+        self.items = array('i')
+        self.positions = array('i')  # Path id -> index in self.items, or -1
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, rel_path: str) -> bool:
+        idx = self.table.get(rel_path)
+        return idx is not None and idx < len(self.positions) and self.positions[idx] >= 0
+
+    def __iter__(self):
+        paths = self.table.paths
+        return (paths[idx] for idx in self.items)
+
+    def add(self, rel_path: str) -> None:
+        idx = self.table.add(rel_path)
+        if idx >= len(self.positions):
+            self.positions.extend(array('i', [-1]) * (len(self.table.paths) - len(self.positions)))
+        if self.positions[idx] < 0:
+            self.positions[idx] = len(self.items)
+            self.items.append(idx)
+
+    def discard(self, rel_path: str) -> None:
+        """Removes a path by moving the last id into its slot."""
+        idx = self.table.get(rel_path)
+        if idx is None or idx >= len(self.positions) or self.positions[idx] < 0:
+            return
+        pos, self.positions[idx] = self.positions[idx], -1
+        last = self.items.pop()
+        if pos < len(self.items):
+            self.items[pos] = last
+            self.positions[last] = pos
+
+    def choice(self, rng: Optional[random.Random] = None) -> str:
+        return self.table.paths[(rng or random).choice(self.items)]
+
+
+class WorkIndex:
+    """Pending files and method indices, updated in place as commits land."""
+
+    def __init__(self, root: Path, rel_paths: Iterable[str] = ()):
+        self.root = root
+        self.paths = PathTable(rel_paths)  # Absolute paths are built on demand, see path()
+        self.python = PathSet(self.paths)
+        self.other = PathSet(self.paths)
+        for rel_path in self.paths.paths:
+            (self.python if os.path.splitext(rel_path)[1] == '.py' else self.other).add(rel_path)
+        self.methods: Dict[str, IndexedSet] = {}  # Pending method indices, filled when a file is first picked
+        self.method_units = 0  # Pending methods across self.methods
+        self.files_parsed = 0
+        self.methods_seen = 0
+
+    @property
+    def total(self) -> int:
+        return len(self.paths)
+
+    def path(self, rel_path: str) -> Path:
+        return self.root / rel_path
+
+    def add_file(self, rel_path: str) -> None:
+        (self.python if os.path.splitext(rel_path)[1] == '.py' else self.other).add(rel_path)
+
+    def apply_state(self, state: State) -> None:
+        """Drops files that a previous run already completed."""
+        for rel_path in state.completed_files:
+            self.complete(rel_path)
+
+    def pending_methods(self, rel_path: str, method_count: int, committed: int) -> IndexedSet:
+        """Returns the method indices of a file not set in the committed bitset, building them on first use."""
+        pending = self.methods.get(rel_path)
+        if pending is None:
+            pending = self.methods[rel_path] = IndexedSet(i for i in range(method_count) if not committed >> i & 1)
+            self.method_units += len(pending)
+            self.files_parsed += 1
+            self.methods_seen += method_count
+        return pending
+
+    def discard_method(self, rel_path: str, method_idx: int) -> None:
+        pending = self.methods.get(rel_path)
+        if pending is not None and method_idx in pending:
+            pending.discard(method_idx)
+            self.method_units -= 1
+
+    def complete(self, rel_path: str) -> None:
+        self.python.discard(rel_path)
+        self.other.discard(rel_path)
+        pending = self.methods.pop(rel_path, None)
+        if pending is not None:
+            self.method_units -= len(pending)
+
+    def forget(self, rel_path: str) -> None:
+        """Drops a deleted file."""
+        self.complete(rel_path)
+        self.paths.discard(rel_path)
+
+    def remaining_units(self) -> float:
+        """Estimates the commits left: known pending methods, unparsed files at the average, other files."""
+        unparsed = len(self.python) - len(self.methods)
+        average = self.methods_seen / self.files_parsed if self.files_parsed else 1
+        return self.method_units + unparsed * average + len(self.other)
+
+
+class Committer:
+    """Commits Python files method by method and other files whole."""
+
+    MIRROR_POLL = 5.0  # Seconds between checks on mirror pushes while idle in --watch
+
     def __init__(self, config: Config):
         self.config = config
-        self.state = State(config)
-        self.git = GitHandler(config)
-        self.all_files = self._get_all_files()
-    def _get_all_files(self) -> List[Path]:
-        """Gets all files in the project directory, excluding .git and state file."""
-        files = [
-            p for p in self.config.project_folder.rglob('*')
-            if p.is_file() and '.git' not in str(p) and p != self.config.state_file
-        ]
-        print(f"Found {len(files)} files")
-        return files
+        self.state = State.create(config)
+        self.manifest = MethodManifest(config)
+        self.metrics = Metrics(config)
+        self.git = GitHandler(config, self.state, self.metrics)
+        self.run_started = time.monotonic()
+        self.watcher: Optional[TreeWatcher] = None  # Set up by _build_work_index with --watch
+        self.work = self._build_work_index()
+        self.progress: Optional[dict] = None  # Shared progress table when run by the Orchestrator
+        self.commits_made = 0  # Commits attempted in this run, for --max-commits
+        self.outcome = 'running'  # How run() ended: 'done', 'stopped', 'paused', 'unpushed' or 'failed'
+        self.plan_commits: Tuple[Optional[list], int, int] = (None, 0, 0)  # (plan, position, commits left there)
+        self.job_name = config.repo_name
+
+    def _build_work_index(self) -> WorkIndex:
+        """Indexes all files in the project directory that are not ignored by .gitignore or --exclude."""
+        scanner = FileScanner(self.config)
+        stats: Optional[Dict[str, Tuple[int, int]]] = {} if self.config.watch else None
+        with self.metrics.phase('scan'):
+            work = WorkIndex(self.config.project_folder, scanner.scan(stats=stats))
+        print(f"Found {work.total} files")
+        if stats is not None and self.config.engine != 'fast-import':
+            self.watcher = TreeWatcher(self.config, scanner, stats)
+        return work
+
     def _extract_methods(self, file_path: Path) -> Tuple[List[str], List[str]]:
-        """Extracts method definitions from a Python file using AST."""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            tree = ast.parse(content)
-            methods = []
-            method_names = []
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    method_code = '\n'.join(content.splitlines()[node.lineno-1:node.end_lineno])
-                    methods.append(method_code)
-                    method_names.append(node.name)
-            return methods, method_names
-        except (UnicodeDecodeError, SyntaxError) as e:
+        """Returns the source and label of each function, async function and class in a Python file.
+
+        Boundaries come from the manifest; the file is parsed only if it changed since.
+        """
+        rel_path = str(file_path.relative_to(self.config.project_folder))
+        try:
+            st = file_path.stat()
+            raw = file_path.read_bytes()
+            units = self.manifest.lookup(rel_path, st, raw)
+            content = raw.decode('utf-8')
+            if units is None:
+                with self.metrics.phase('parse'):
+                    units = parse_units(content)
+                self.manifest.store(rel_path, st, raw, units)
+            return [content[start:end] for start, end, _ in units], [label for _, _, label in units]
+        except (UnicodeDecodeError, SyntaxError, ValueError) as e:
             print(f"Cannot parse {file_path}: {e}")
             return [], []
-    def _get_remaining_files(self) -> Tuple[List[Path], List[Path]]:
-        """Separates remaining files into Python and non-Python files."""
-        python_files, other_files = [], []
-        for file in self.all_files:
-            rel_path = str(file.relative_to(self.config.project_folder))
-            if rel_path in self.state.completed_files:
+
+    def _parse_all(self) -> None:
+        """Parses every Python file the manifest has no fresh entry for, fanned out over worker processes.
+
+        Small projects, or --parse-workers 1, are left to the lazy parse in _extract_methods.
+        """
+        stale: Dict[str, str] = {}  # Absolute path -> rel_path
+        for rel_path in self.work.python:
+            file_path = self.work.path(rel_path)
+            try:
+                if not self.manifest.is_fresh(rel_path, file_path.stat()):
+                    stale[str(file_path)] = rel_path
+            except OSError:
                 continue
-            if file.suffix == '.py':
-                python_files.append(file)
-            else:
-                other_files.append(file)
-        return python_files, other_files
-    def _commit_method(self, file_path: Path, method_content: str, method_name: str, method_idx: int) -> bool:
-        """Commits a single method to the repository."""
+        workers = min(self.config.parse_workers, len(stale) // 16)
+        if workers < 2:
+            return
+        with self.metrics.phase('parse_pool'), ProcessPoolExecutor(max_workers=workers) as pool:
+            chunk_size = max(1, len(stale) // (workers * 8))
+            for path, size, mtime_ns, sha1, units in pool.map(_parse_file, stale, chunksize=chunk_size):
+                if units is not None:
+                    self.manifest.store_parsed(stale[path], size, mtime_ns, sha1, units)
+        print(f"Parsed {len(stale)} Python files in {workers} processes")
+
+    def _get_remaining_files(self) -> Tuple[PathSet, PathSet]:
+        """Returns the pending Python and non-Python files (relative paths)."""
+        return self.work.python, self.work.other
+
+    def _commit_method(self, file_path: Path, method_content: str, label: str, method_idx: int,
+                       method_count: int, when: Optional[int] = None) -> bool:
+        """Commits a single method (or class) to the repository, dated at when if given."""
         rel_path = str(file_path.relative_to(self.config.project_folder))
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(method_content.strip() + '\n')
-            commit_msg = f"Add method {method_name} in {rel_path} (index {method_idx})"
-            success = self.git.commit_and_push(file_path, commit_msg)
+            content = method_content.strip() + '\n'
+            commit_msg = f"Add {label} in {rel_path} (index {method_idx})"
+            if self.config.engine == 'objects':
+                success = self.git.commit_content([(file_path, content.encode('utf-8'))], commit_msg, when)
+            else:
+                original = file_path.read_bytes()
+                original_stat = file_path.stat()
+                try:
+                    with self.metrics.phase('file_write'), open(file_path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    success = self.git.commit_and_push([file_path], commit_msg, when)
+                finally:
+                    with self.metrics.phase('file_write'):
+                        file_path.write_bytes(original)  # Restore original content
+                        os.utime(file_path, ns=(original_stat.st_atime_ns, original_stat.st_mtime_ns))
             if success:
-                self.state.partial_methods.setdefault(rel_path, []).append(method_idx)
-                if len(self.state.partial_methods[rel_path]) == len(self._extract_methods(file_path)[0]):
-                    self.state.completed_files.add(rel_path)
-                    del self.state.partial_methods[rel_path]
+                self.work.discard_method(rel_path, method_idx)
+                if self.state.mark_method(rel_path, method_idx) == method_count:
+                    self.state.mark_completed(rel_path)
+                    self.work.complete(rel_path)
             return success
         except Exception as e:
-            print(f"Error committing method {method_name}: {e}")
+            print(f"Error committing {label}: {e}")
             return False
-    def _commit_whole_file(self, file_path: Path) -> bool:
-        """Commits an entire non-Python file."""
-        rel_path = str(file_path.relative_to(self.config.project_folder))
-        success = self.git.commit_and_push(file_path, f"Add {rel_path}")
+
+    @staticmethod
+    def _files_message(rel_paths: Sequence[str]) -> str:
+        if len(rel_paths) == 1:
+            return f"Add {rel_paths[0]}"
+        return f"Add {len(rel_paths)} files in {os.path.dirname(rel_paths[0]) or '.'}"
+
+    def _commit_whole_files(self, rel_paths: Sequence[str], when: Optional[int] = None) -> bool:
+        """Commits non-Python files whole in one commit, dated at when if given."""
+        file_paths = [self.work.path(rel_path) for rel_path in rel_paths]
+        message = self._files_message(rel_paths)
+        if self.config.engine == 'objects':
+            success = self.git.commit_content([(file_path, None) for file_path in file_paths], message, when)
+        else:
+            success = self.git.commit_and_push(file_paths, message, when)
         if success:
-            self.state.completed_files.add(rel_path)
+            for rel_path in rel_paths:
+                self.state.mark_completed(rel_path)
+                self.work.complete(rel_path)
         return success
-    def _display_progress(self, python_files: List[Path], other_files: List[Path]) -> None:
-        """Displays progress with a progress bar and time estimates."""
-        total_files = len(self.all_files)
+
+    def _file_size(self, rel_path: str) -> Optional[int]:
+        try:
+            return self.work.path(rel_path).stat().st_size
+        except OSError:
+            return None
+
+    def _group_candidates(self, rel_paths: Iterable[str]) -> Dict[str, deque]:
+        """Indexes the files small enough to be grouped by folder, as (rel_path, size) in path order.
+
+        Each file is stat'ed once here rather than on every pick that looks at its folder.
+        """
+        budget = self.config.group_max_bytes
+        folder_files: Dict[str, deque] = {}
+        for rel_path in rel_paths:
+            size = self._file_size(rel_path)
+            if size is not None and size < budget:
+                folder_files.setdefault(os.path.dirname(rel_path), deque()).append((rel_path, size))
+        return folder_files
+
+    def _group_members(self, rel_path: str, folder_files: Dict[str, deque], pending: IndexedSet) -> List[str]:
+        """Picks pending small files of rel_path's folder, in path order, to commit along with it.
+
+        The group stays within --group-max-bytes and --group-max-files; a file at or above the
+        byte budget is always committed alone. Files at the front of the folder's queue that are
+        no longer pending are dropped, so the queue's head works as a cursor.
+        """
+        budget = self.config.group_max_bytes
+        size = self._file_size(rel_path) if budget else None
+        if size is None or size >= budget:
+            return []
+        candidates = folder_files.get(os.path.dirname(rel_path), deque())
+        while candidates and candidates[0][0] not in pending:
+            candidates.popleft()
+        members = []
+        for candidate, candidate_size in candidates:
+            if len(members) + 1 >= self.config.group_max_files:
+                break
+            if size + candidate_size <= budget and candidate in pending:
+                size += candidate_size
+                members.append(candidate)
+        return members
+
+    def _plan_commits(self, seed: int, backdate: bool) -> List[Tuple[str, Optional[int], int]]:
+        """Orders and schedules every remaining commit up front, without committing anything.
+
+        Picks are drawn like run() always did (a Python method 70% of the time) but from a
+        Random(seed) over sorted paths, so the same seed and tree give the same plan. Entries are
+        (rel_path, method_idx, unix time) with method_idx None for whole-file commits. The schedule
+        keeps the configured wait range between commits and starts now, or with backdate ends now.
+        A backdated schedule never starts before the current HEAD commit; if there is too little time
+        since HEAD its intervals are scaled down to fit, so no date lies in the future. Small files
+        grouped with a picked one follow it as GROUPED entries with the same time.
+        """
+        self._parse_all()
+        rng = random.Random(seed)
+        python_files, other_files = IndexedSet(sorted(self.work.python)), IndexedSet(sorted(self.work.other))
+        folder_files = self._group_candidates(other_files) if self.config.group_max_bytes else {}
+        pending: Dict[str, IndexedSet] = {}
+        order = []
+        while python_files or other_files:
+            if python_files and (not other_files or rng.random() < 0.7):
+                rel_path = python_files.choice(rng)
+                left = pending.get(rel_path)
+                if left is None:
+                    methods, _ = self._extract_methods(self.work.path(rel_path))
+                    left = pending[rel_path] = IndexedSet(self.work.pending_methods(
+                        rel_path, len(methods), self.state.partial_methods.get(rel_path, 0)))
+                    if not left:  # No methods left to commit
+                        self.state.mark_completed(rel_path)
+                        self.work.complete(rel_path)
+                if left:
+                    method_idx = left.choice(rng)
+                    left.discard(method_idx)
+                    order.append((rel_path, method_idx))
+                if not left:
+                    python_files.discard(rel_path)
+            else:
+                rel_path = other_files.choice(rng)
+                other_files.discard(rel_path)
+                order.append((rel_path, None))
+                for member in self._group_members(rel_path, folder_files, other_files):
+                    other_files.discard(member)
+                    order.append((member, State.GROUPED))
+
+        intervals = [rng.randint(*self.config.wait_range) for _ in order]
+        intervals = [0 if method_idx == State.GROUPED else i for (_, method_idx), i in zip(order, intervals)]
+        now = int(time.time())
+        start, total, room = now, sum(intervals), sum(intervals)
+        if backdate:
+            start = now - total
+            head = self.git.repo.head.commit.committed_date if self.git.repo.head.is_valid() else start
+            if head > now:
+                print(f"Error: HEAD is dated {datetime.fromtimestamp(head)}, after the current time, so the "
+                      f"history cannot be backdated to end now")
+                raise SystemExit(1)
+            if start < head:  # Too little time since HEAD: squeeze the schedule in between
+                start, room = head, now - head
+        plan = []
+        elapsed = 0
+        for (rel_path, method_idx), interval in zip(order, intervals):
+            elapsed += interval
+            plan.append((rel_path, method_idx, start + (elapsed * room // total if total else 0)))
+        return plan
+
+    def _load_plan(self) -> bool:
+        """Plans the remaining work unless the stored plan still has entries; returns False if nothing is left.
+
+        A new plan uses --seed (or a random one) the first time and the next seed when files were
+        left over by the previous plan, e.g. ones added since or whose commits failed.
+        """
+        if self.state.plan_pos < len(self.state.plan):
+            if self.config.seed is not None and self.config.seed != self.state.plan_seed:
+                print(f"Resuming the stored plan (seed {self.state.plan_seed}), --seed {self.config.seed} is ignored")
+            return True
+        if not (self.work.python or self.work.other):
+            return False
+        if self.state.plan_seed is not None:
+            seed = self.state.plan_seed + 1
+        else:
+            seed = self.config.seed if self.config.seed is not None else random.randrange(2 ** 32)
+        with self.metrics.phase('plan'):
+            plan = self._plan_commits(seed, self.config.compress_time or self.config.engine == 'fast-import')
+        self.state.set_plan(seed, plan)
+        self.manifest.save()
+        print(f"Planned {len(plan)} commit(s) with seed {seed}")
+        return bool(plan)
+
+    def _is_pending(self, rel_path: str, method_idx: Optional[int]) -> bool:
+        """Returns True if a plan entry was not committed yet and its file still exists."""
+        if method_idx is None or method_idx == State.GROUPED:
+            return rel_path in self.work.other
+        return rel_path in self.work.python and not self.state.is_method_committed(rel_path, method_idx)
+
+    def show_plan(self) -> None:
+        """Prints the remaining plan without committing; it is stored, so the next run follows it."""
+        self.state.load()
+        self.manifest.load()
+        self.work.apply_state(self.state)
+        self._load_plan()
+        plan, names = self.state.plan, {}
+        print(f"Plan seed {self.state.plan_seed}: {self._remaining_commits()} commit(s) left")
+        for pos in range(self.state.plan_pos, len(plan)):
+            rel_path, method_idx, when = plan[pos]
+            if method_idx is None:
+                target = rel_path
+            elif method_idx == State.GROUPED:
+                target = f"{rel_path} (same commit)"
+            else:
+                if rel_path not in names:
+                    known = rel_path in self.work.paths
+                    names[rel_path] = self._extract_methods(self.work.path(rel_path))[1] if known else []
+                labels = names[rel_path]
+                target = f"{rel_path}: {labels[method_idx] if method_idx < len(labels) else f'#{method_idx}'}"
+            print(f"{pos + 1:>7}  {datetime.fromtimestamp(when):%Y-%m-%d %H:%M:%S}  {target}")
+
+    def run_fast_import(self) -> None:
+        """Writes the remaining history through one `git fast-import` process and pushes once at the end."""
+        self.state.load()
+        self.manifest.load()
+        self.work.apply_state(self.state)
+        repo = self.git.repo
+        if repo.head.is_detached:
+            print("Error: fast-import needs a checked-out branch, HEAD is detached")
+            raise SystemExit(1)
+        self._push_leftovers()
+
+        self._load_plan()
+        plan = [entry for entry in self.state.plan[self.state.plan_pos:] if self._is_pending(*entry[:2])]
+        if not plan:
+            print("Nothing left to commit")
+            self.outcome = 'done'
+            return
+        # Grouped files join the commit of the file entry before them
+        commits: List[Tuple[List[Tuple[str, Optional[int]]], int]] = []  # ([(rel_path, method_idx)], time)
+        planned: Dict[str, List[Optional[int]]] = {}
+        for rel_path, method_idx, when in plan:
+            if method_idx == State.GROUPED:
+                method_idx = None
+                group = commits[-1][0] if commits and commits[-1][1] == when else []
+                if group and group[0][1] is None and os.path.dirname(group[0][0]) == os.path.dirname(rel_path):
+                    group.append((rel_path, None))
+                    planned.setdefault(rel_path, []).append(None)
+                    continue
+            commits.append(([(rel_path, method_idx)], when))
+            planned.setdefault(rel_path, []).append(method_idx)
+
+        parent = repo.head.commit if repo.head.is_valid() else None
+        timestamp = parent.committed_date if parent else 0  # Dates come from the plan, never going back
+        stream = FastImportStream(self.config.project_folder, repo.head.ref.path,
+                                  parent.hexsha if parent else None, git.Actor.committer(repo.config_reader()))
+        print(f"Streaming {len(commits)} commits to git fast-import")
+        try:
+            # Blobs go first, one file at a time, so each file is read and sliced only once
+            blobs: Dict[Tuple[str, Optional[int]], Tuple[int, str]] = {}  # -> (mark, blob sha)
+            names: Dict[Tuple[str, int], str] = {}
+            for rel_path, indices in tqdm(planned.items(), desc="Writing blobs"):
+                file_path = self.work.path(rel_path)
+                if indices[0] is None:
+                    blobs[(rel_path, None)] = stream.blob_file(file_path)
+                    continue
+                methods, labels = self._extract_methods(file_path)
+                for method_idx in indices:
+                    if method_idx >= len(methods):
+                        continue  # The file lost methods since it was planned
+                    data = (methods[method_idx].strip() + '\n').encode('utf-8')
+                    blobs[(rel_path, method_idx)] = (stream.blob(data),
+                                                     hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest())
+                    names[(rel_path, method_idx)] = labels[method_idx]
+
+            current: Dict[str, Optional[str]] = {}  # Blob sha each path has at the tip of the stream
+            for members, when in tqdm(commits, desc="Writing commits"):
+                changes = []
+                for rel_path, method_idx in members:
+                    if (rel_path, method_idx) not in blobs:
+                        continue
+                    mark, sha = blobs[(rel_path, method_idx)]
+                    if rel_path not in current:
+                        try:
+                            current[rel_path] = (parent.tree / rel_path.replace(os.sep, '/')).hexsha if parent else None
+                        except KeyError:
+                            current[rel_path] = None
+                    if current[rel_path] == sha:
+                        continue  # Same content as before, like the "No changes to commit" case in run()
+                    current[rel_path] = sha
+                    mode = 0o100755 if os.access(self.work.path(rel_path), os.X_OK) else 0o100644
+                    changes.append((rel_path, mark, mode))
+                if not changes:
+                    continue
+                timestamp = max(when, timestamp)  # Equal dates are fine; bumping them could pass the present
+                rel_path, method_idx = members[0]
+                if method_idx is None:
+                    message = self._files_message([path for path, _, _ in changes])
+                else:
+                    message = f"Add {names[(rel_path, method_idx)]} in {rel_path} (index {method_idx})"
+                stream.commit(changes, message, timestamp)
+        except (KeyboardInterrupt, OSError) as e:
+            stream.proc.kill()
+            stream.proc.wait()
+            print(f"\nfast-import aborted ({type(e).__name__}: {e}), nothing was committed")
+            self.outcome = 'paused' if isinstance(e, KeyboardInterrupt) else 'failed'
+            return
+        if not stream.close():
+            print("\nError: git fast-import failed, nothing was committed")
+            raise SystemExit(1)
+
+        tip = repo.head.commit
+        repo.git.read_tree(tip.hexsha)  # fast-import left the index at the old tip; later commits start from it
+        self.state.add_unpushed(tip.hexsha)
+        print(f"Imported {stream.commits} commits, pushing")
+        if self.git.flush(wait=True):
+            print("\n🎉 All files committed successfully! 🎉")
+            self.outcome = 'done'
+            self.state.remove()
+            self.manifest.remove()
+            return
+        for rel_path in planned:
+            self.state.mark_completed(rel_path)
+        self.state.plan_pos = len(self.state.plan)
+        self._save_state()
+        self.outcome = 'unpushed'
+        print("\nAll commits imported, but the push failed. Run again to retry.")
+
+    def _same_as_head(self, rel_path: str, file_path: Path) -> bool:
+        """Returns True if the file's content is what HEAD has at its path, hashing it in chunks."""
+        try:
+            head_sha = (self.git.repo.head.commit.tree / rel_path.replace(os.sep, '/')).hexsha
+            with open(file_path, 'rb') as f:
+                sha = hashlib.sha1(b'blob %d\0' % os.fstat(f.fileno()).st_size)
+                for chunk in iter(lambda: f.read(FastImportStream.CHUNK_SIZE), b''):
+                    sha.update(chunk)
+        except (KeyError, ValueError, OSError):
+            return False
+        return sha.hexdigest() == head_sha
+
+    def _refresh_file(self, rel_path: str) -> bool:
+        """Queues a created or changed file; returns False if its content did not actually change.
+
+        A changed Python file is parsed again, and methods whose label was committed before stay
+        committed, so only new functions and classes are queued. A changed non-Python file that
+        was already committed is queued again unless it matches HEAD.
+        """
+        file_path = self.config.project_folder / rel_path
+        known = rel_path in self.work.paths
+        if file_path.suffix == '.py':
+            entry = self.manifest.entries.get(rel_path)
+            try:
+                raw = file_path.read_bytes()
+                unchanged = entry is not None and self.manifest.lookup(rel_path, file_path.stat(), raw) is not None
+            except OSError:
+                return False
+            if unchanged and known:
+                return False
+            old_labels = [label for _, _, label in entry['methods']] if entry else []
+            if rel_path in self.state.completed_files:
+                committed = set(old_labels)
+            else:
+                committed = {old_labels[i] for i in self.state.committed_methods(rel_path) if i < len(old_labels)}
+            _, labels = self._extract_methods(file_path)
+            keep = [i for i, label in enumerate(labels) if label in committed]
+        else:
+            if rel_path in self.work.other:
+                return False  # Still pending, its latest content is committed when it comes up
+            if rel_path in self.state.completed_files and self._same_as_head(rel_path, file_path):
+                self.work.paths.add(rel_path)
+                return False
+            keep = []
+        self.state.reopen(rel_path, keep)
+        self.work.complete(rel_path)
+        self.work.add_file(rel_path)
+        return True
+
+    def _apply_changes(self, changed: Set[str], deleted: Set[str]) -> Set[str]:
+        """Updates the pending work for files the watcher reported; returns the paths it touched."""
+        touched = set()
+        with self.metrics.phase('watch'):
+            for rel_path in deleted:
+                if rel_path in self.work.paths:
+                    self.work.forget(rel_path)
+                    touched.add(rel_path)
+            for rel_path in sorted(changed):
+                if self._refresh_file(rel_path):
+                    touched.add(rel_path)
+        if touched:
+            print(f"Picked up {len(touched)} created, changed or deleted file(s)")
+            self.manifest.save()
+        return touched
+
+    def _idle_start(self) -> None:
+        self._save_state()
+        self.manifest.save()
+        self._export_metrics()
+        print("\nEverything is committed, watching for changes (Ctrl+C to stop)")
+
+    def _mirror_poll(self) -> Optional[float]:
+        """How long an idle wait may last: MIRROR_POLL while a mirror push is in flight, else until a change."""
+        return self.MIRROR_POLL if self.git.sync_mirrors() else None
+
+    def _idle(self) -> None:
+        """Pushes what is left and runs due maintenance, then blocks until the watcher reports new work.
+
+        Mirrors are not waited for; the wait wakes up to record their pushes and start the next one.
+        """
+        self.git.flush()
+        self.git.maintain()
+        self._idle_start()
+        with self.metrics.phase('wait'):
+            while not self._apply_changes(*self.watcher.changes(timeout=self._mirror_poll())):
+                pass
+
+    async def _idle_async(self) -> None:
+        await asyncio.to_thread(self.git.flush)
+        await asyncio.to_thread(self.git.maintain)
+        self._idle_start()
+        with self.metrics.phase('wait'):
+            while not self._apply_changes(*await self.watcher.wait_async(self._mirror_poll())):
+                pass
+
+    def _remaining_commits(self) -> float:
+        """Commits left: exact from the plan, estimated from the work index before there is one."""
+        plan, pos = self.state.plan, self.state.plan_pos
+        if not plan:
+            return self.work.remaining_units()
+        counted_plan, counted_pos, left = self.plan_commits
+        if counted_plan is not plan:  # New plan; grouped entries share the commit before them
+            counted_plan, counted_pos, left = plan, 0, sum(entry[1] != State.GROUPED for entry in plan)
+        left -= sum(entry[1] != State.GROUPED for entry in plan[counted_pos:pos])
+        self.plan_commits = (plan, pos, left)
+        return left
+
+    def _next_interval(self) -> int:
+        """Seconds to wait before the next commit: the planned gap, or none when time is compressed."""
+        plan, pos = self.state.plan, self.state.plan_pos
+        if self.config.compress_time or not 0 < pos < len(plan):
+            return 0
+        return max(0, plan[pos][2] - plan[pos - 1][2])
+
+    def _eta_seconds(self) -> Optional[float]:
+        """Estimates the time left from this run's seconds per commit and the remaining commit count."""
+        if not self.commits_made:
+            return None
+        seconds_per_commit = (time.monotonic() - self.run_started) / self.commits_made
+        return seconds_per_commit * self._remaining_commits()
+
+    def _export_metrics(self) -> None:
+        eta = self._eta_seconds()
+        self.metrics.export({
+            'commits_total': self.commits_made,
+            'remaining_commits': round(self._remaining_commits()),
+            'eta_seconds': round(eta) if eta is not None else -1,
+        })
+
+    def _save_state(self) -> None:
+        with self.metrics.phase('state_save'):
+            self.state.save()
+
+    def _display_progress(self, python_files: PathSet, other_files: PathSet) -> None:
+        """Displays progress with a progress bar and a per-commit time estimate."""
+        total_files = self.work.total
         completed = len(self.state.completed_files)
         remaining = len(python_files) + len(other_files)
+        remaining_commits = round(self._remaining_commits())
         progress_pct = (completed / total_files * 100) if total_files else 0
         elapsed = datetime.now() - self.state.start_time
-        eta_str = "Unknown"
-        if completed > 0 and remaining > 0:
-            seconds_per_file = elapsed.total_seconds() / completed
-            eta = timedelta(seconds=int(seconds_per_file * remaining))
-            eta_str = str(eta)
+        eta = self._eta_seconds()
+        eta_str = str(timedelta(seconds=int(eta))) if eta is not None and remaining else "Unknown"
+        if self.progress is not None:
+            self.progress[self.job_name] = {
+                'status': 'running', 'completed': completed, 'total': total_files, 'eta': eta_str
+            }
+            return
         bar_length = 40
         filled = int(bar_length * completed / total_files) if total_files else 0
         bar = '█' * filled + '░' * (bar_length - filled)
-        os.system('cls' if os.name == 'nt' else 'clear')
+        print('\033[2J\033[H', end='')  # Clear the screen with ANSI codes instead of spawning `clear`
         print(f"\n{'=' * 60}\nGitHub Auto-Commit Progress\n{'=' * 60}")
         print(f"Progress: [{bar}] {progress_pct:.1f}%")
         print(f"Files: {completed}/{total_files} completed, {remaining} remaining")
         print(f"Types: {len(python_files)} Python, {len(other_files)} other")
+        print(f"Commits: {self.commits_made} this run, ~{remaining_commits} remaining")
         print(f"Time elapsed: {elapsed}")
         print(f"Estimated time remaining: {eta_str}\n{'=' * 60}\n")
+
+    def _pick_next(self) -> Optional[Tuple[str, str, Optional[int], List[str], List[str], int]]:
+        """Returns the next entry of the plan, or None once the plan is used up.
+
+        Returns (kind, rel_path, method_idx, methods, labels, when) where kind is 'method',
+        'file' (methods then lists the files committed together), or 'empty' for a Python file that
+        has no methods left to commit. Entries that were committed already or whose file is gone
+        are skipped.
+        """
+        with self.metrics.phase('select'):
+            plan = self.state.plan
+            while self.state.plan_pos < len(plan):
+                rel_path, method_idx, when = plan[self.state.plan_pos]
+                if self._is_pending(rel_path, method_idx):
+                    if method_idx is None or method_idx == State.GROUPED:
+                        group, following = [rel_path], self.state.plan_pos + 1
+                        while following < len(plan) and plan[following][1] == State.GROUPED:
+                            if plan[following][0] in self.work.other:
+                                group.append(plan[following][0])
+                            following += 1
+                        return 'file', rel_path, None, group, [], when
+                    methods, labels = self._extract_methods(self.work.path(rel_path))
+                    uncommitted = self.work.pending_methods(rel_path, len(methods),
+                                                            self.state.partial_methods.get(rel_path, 0))
+                    if not uncommitted:
+                        return 'empty', rel_path, None, methods, labels, when
+                    if method_idx in uncommitted:
+                        return 'method', rel_path, method_idx, methods, labels, when
+                self.state.plan_pos += 1
+            return None
+
+    def _commit_pick(self, pick: Tuple[str, str, Optional[int], List[str], List[str], int]) -> bool:
+        """Commits a pick from _pick_next; returns False if there was nothing to commit."""
+        kind, rel_path, method_idx, methods, labels, when = pick
+        file_to_commit = self.work.path(rel_path)
+        plan = self.state.plan
+        self.state.plan_pos += 1
+        while self.state.plan_pos < len(plan) and plan[self.state.plan_pos][1] == State.GROUPED:
+            self.state.plan_pos += 1  # Part of this commit, or of a group whose first file is gone
+        when = when if self.config.compress_time else None
+        if kind == 'empty':
+            self.state.mark_completed(rel_path)
+            self.work.complete(rel_path)
+            return False
+        if kind == 'method':
+            print(f"Committing {labels[method_idx]} in {file_to_commit.name}")
+            self._commit_method(file_to_commit, methods[method_idx], labels[method_idx], method_idx,
+                                len(methods), when)
+        else:
+            if len(methods) == 1:
+                print(f"Committing file: {file_to_commit.name}")
+            else:
+                print(f"Committing {len(methods)} files in {os.path.dirname(rel_path) or '.'}")
+            self._commit_whole_files(methods, when)
+        self.commits_made += 1
+        return True
+
+    def _limit_reached(self) -> bool:
+        return bool(self.config.max_commits) and self.commits_made >= self.config.max_commits
+
+    def _push_leftovers(self) -> None:
+        """Pushes the commits a previous run made but could not push."""
+        if self.state.unpushed_commits:
+            print(f"Pushing {len(self.state.unpushed_commits)} commit(s) left from the previous run")
+            self.git.flush()
+            self._save_state()
+
+    def _stored_wait(self) -> Optional[int]:
+        """Seconds left of the wait the previous run stopped in, or None if it was not waiting."""
+        if not self.state.current_wait_until or self.state.first_run:
+            return None
+        seconds = max(0, int((self.state.current_wait_until - datetime.now()).total_seconds()))
+        if seconds:
+            print(f"Resuming wait: {seconds} seconds")
+        return seconds
+
+    def _end_wait(self) -> None:
+        self.state.current_wait_until = None
+        self._save_state()
+
+    @contextlib.contextmanager
+    def _saved_on_exit(self):
+        """Pushes and saves everything when the loop is left by Ctrl+C, which pauses the job, or by an error."""
+        try:
+            yield
+        except KeyboardInterrupt:
+            print("\nPaused. Resume by running the script again.")
+            self.outcome = 'paused'
+            self.git.flush(wait=True)
+            self._save_state()
+            self.manifest.save()
+        except Exception as e:
+            print(f"\nError: {e}")
+            self.git.flush(wait=True)
+            self._save_state()
+            self.manifest.save()
+            raise
+
+    def _stop_early(self) -> None:
+        """Stops after --max-commits; the next run resumes where this one left off."""
+        self.git.flush(wait=True)
+        self._save_state()
+        self.manifest.save()
+        self._export_metrics()
+        self.outcome = 'stopped'
+        print(f"\nStopped after {self.commits_made} commit(s). Resume by running the script again.")
+
+    def _finish(self) -> None:
+        """Pushes what is left and clears the state once every file is committed."""
+        flushed = self.git.flush(wait=True)
+        self._export_metrics()
+        if not flushed:
+            print("\nAll files committed, but the final push failed. Run again to retry.")
+            self.outcome = 'unpushed'
+            self._save_state()
+            return
+        print("\n🎉 All files committed successfully! 🎉")
+        self.outcome = 'done'
+        self.state.remove()
+        self.manifest.remove()
+
     def run(self) -> None:
         """Runs the commit process with wait intervals and state management."""
+        if self.config.engine == 'fast-import':
+            self.run_fast_import()
+            return
+        if self.config.pipeline:
+            self.run_async()
+            return
         self.state.load()
-        try:
-            if self.state.current_wait_until and not self.state.first_run:
-                wait_seconds = (self.state.current_wait_until - datetime.now()).total_seconds()
-                if wait_seconds > 0:
-                    print(f"Resuming wait: {int(wait_seconds)} seconds")
-                    for _ in tqdm(range(int(wait_seconds)), desc="Waiting to resume"):
+        self.manifest.load()
+        self.work.apply_state(self.state)
+        with self._saved_on_exit():
+            self._load_plan()
+            self._push_leftovers()
+            seconds = self._stored_wait()
+            if seconds:
+                with self.metrics.phase('wait'):
+                    for _ in tqdm(range(seconds), desc="Waiting to resume"):
                         time.sleep(1)
-                self.state.current_wait_until = None
-                self.state.save()
+            if seconds is not None:
+                self._end_wait()
 
             while True:
+                if self.watcher:
+                    self._apply_changes(*self.watcher.changes())
                 python_files, other_files = self._get_remaining_files()
                 self._display_progress(python_files, other_files)
-                if not python_files and not other_files:
-                    print("\n🎉 All files committed successfully! 🎉")
-                    if self.config.state_file.exists():
-                        os.remove(self.config.state_file)
+                pick = self._pick_next()
+                if pick is None:
+                    if self._load_plan():
+                        continue
+                    if self.watcher:
+                        self._idle()
+                        continue
+                    self._finish()
+                    break
+                if not self._commit_pick(pick):
+                    continue
+                if self._limit_reached():
+                    self._stop_early()
                     break
 
-                file_to_commit = None
-                if python_files and (not other_files or random.random() < 0.7):
-                    file_to_commit = random.choice(python_files)
-                    methods, method_names = self._extract_methods(file_to_commit)
-                    rel_path = str(file_to_commit.relative_to(self.config.project_folder))
-                    committed_indices = set(self.state.partial_methods.get(rel_path, []))
-                    uncommitted = [i for i in range(len(methods)) if i not in committed_indices]
-                    if not uncommitted:
-                        self.state.completed_files.add(rel_path)
-                        if rel_path in self.state.partial_methods:
-                            del self.state.partial_methods[rel_path]
-                        continue
-                    method_idx = random.choice(uncommitted)
-                    print(f"Committing method {method_names[method_idx]} in {file_to_commit.name}")
-                    self._commit_method(file_to_commit, methods[method_idx], method_names[method_idx], method_idx)
-                    with open(file_to_commit, 'w', encoding='utf-8') as f:
-                        f.write('\n'.join(methods))  # Restore original content
-                elif other_files:
-                    file_to_commit = random.choice(other_files)
-                    print(f"Committing file: {file_to_commit.name}")
-                    self._commit_whole_file(file_to_commit)
-
-                interval = random.randint(10, 50)
+                self.manifest.save()
+                interval = self._next_interval()
+                if not interval:
+                    self.git.maybe_flush()
+                    self.git.maintain()  # No wait to hide it in, so it runs between commits
+                    self._save_state()
+                    self._export_metrics()
+                    continue
                 self.state.current_wait_until = datetime.now() + timedelta(seconds=interval)
-                self.state.save()
+                self._save_state()
                 print(f"\nNext commit at: {self.state.current_wait_until.strftime('%H:%M:%S')}")
                 print(f"Waiting {interval} seconds...")
-                try:
+                maintenance = self.git.start_maintenance()
+                with self.metrics.phase('wait'):
                     for _ in tqdm(range(interval), desc="Time until next commit"):
                         time.sleep(1)
-                    self.state.current_wait_until = None
-                    self.state.save()
-                except KeyboardInterrupt:
-                    print("\nPaused. Resume by running the script again.")
-                    self.state.save()
-                    raise
-        except KeyboardInterrupt:
-            print("\nPaused. Resume by running the script again.")
-            self.state.save()
-        except Exception as e:
-            print(f"\nError: {e}")
-            self.state.save()
-            raise
\ No newline at end of file
+                    if maintenance:
+                        maintenance.result()  # Only waits if maintenance outlasted the interval
+                self.git.maybe_flush()
+                self._end_wait()
+                self._export_metrics()
+
+    def run_async(self) -> None:
+        """Runs the commit loop on asyncio so pushes and the next pick overlap with the wait."""
+        self.state.load()
+        self.manifest.load()
+        self.work.apply_state(self.state)
+        with self._saved_on_exit():
+            self._load_plan()
+            asyncio.run(self._pipeline())
+
+    async def _wait(self, seconds: int, desc: str) -> None:
+        with self.metrics.phase('wait'):
+            for _ in tqdm(range(seconds), desc=desc):
+                await asyncio.sleep(1)
+
+    async def _pipeline(self) -> None:
+        """Commits on the event loop thread; pushes and picks run in worker threads during the wait.
+
+        Commits, state writes and the progress view stay on this thread. A push for commit N and the
+        pick (and parse) of commit N+1 start right after commit N and are awaited when the wait ends,
+        so the cadence is the wait interval rather than interval plus push latency. Due repository
+        maintenance runs in the same window.
+        """
+        await asyncio.to_thread(self._push_leftovers)
+        seconds = self._stored_wait()
+        if seconds:
+            await self._wait(seconds, "Waiting to resume")
+        if seconds is not None:
+            self._end_wait()
+
+        push_task: Optional[asyncio.Task] = None
+        maintenance_task: Optional[asyncio.Future] = None
+        pick_task: Optional[asyncio.Task] = asyncio.create_task(asyncio.to_thread(self._pick_next))
+        try:
+            while True:
+                pick = await pick_task
+                pick_task = None
+                if self.watcher:
+                    touched = self._apply_changes(*self.watcher.changes())
+                    if pick and pick[1] in touched:
+                        pick = self._pick_next()  # The picked file changed while it was being picked
+                python_files, other_files = self._get_remaining_files()
+                self._display_progress(python_files, other_files)
+                if pick is None:
+                    while not self._load_plan() and self.watcher:
+                        await self._idle_async()
+                    if self.state.plan_pos < len(self.state.plan):
+                        pick_task = asyncio.create_task(asyncio.to_thread(self._pick_next))
+                        continue
+                    self._finish()
+                    return
+                if not self._commit_pick(pick):
+                    pick_task = asyncio.create_task(asyncio.to_thread(self._pick_next))
+                    continue
+                if self._limit_reached():
+                    self._stop_early()
+                    return
+
+                self.manifest.save()
+                interval = self._next_interval()
+                if not interval:
+                    await asyncio.to_thread(self.git.maybe_flush)
+                    await asyncio.to_thread(self.git.maintain)
+                    self._save_state()
+                    self._export_metrics()
+                    pick_task = asyncio.create_task(asyncio.to_thread(self._pick_next))
+                    continue
+                self.state.current_wait_until = datetime.now() + timedelta(seconds=interval)
+                self._save_state()
+                print(f"\nNext commit at: {self.state.current_wait_until.strftime('%H:%M:%S')}")
+                print(f"Waiting {interval} seconds...")
+                if self.git.push_due():
+                    push_task = asyncio.create_task(asyncio.to_thread(self.git.flush))
+                pick_task = asyncio.create_task(asyncio.to_thread(self._pick_next))
+                if maintenance := self.git.start_maintenance():
+                    maintenance_task = asyncio.wrap_future(maintenance)
+                await self._wait(interval, "Time until next commit")
+                if push_task:
+                    await push_task
+                    push_task = None
+                if maintenance_task:
+                    await maintenance_task
+                    maintenance_task = None
+                # The pick updates state too; its result is taken at the top of the loop
+                await asyncio.wait([pick_task])
+                self._end_wait()
+                self._export_metrics()
+        finally:
+            # Worker threads cannot be interrupted; let them finish before state is saved
+            pending = [task for task in (push_task, pick_task, maintenance_task) if task]
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _run_job(name: str, options: dict, push_slots, mirror_slots, progress) -> None:
+    """Runs one orchestrated job in a process of its own, logging next to its state file."""
+    config = build_config(options)
+    with open(config.log_file, 'a', encoding='utf-8', buffering=1) as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        progress[name] = {'status': 'starting'}
+        try:
+            committer = Committer(config)
+            committer.git.push_slots, committer.git.mirror_slots = push_slots, mirror_slots
+            committer.progress, committer.job_name = progress, name
+            committer.run()
+        except BaseException as e:
+            error = f"exited, see {config.log_file}" if isinstance(e, SystemExit) else str(e) or type(e).__name__
+            progress[name] = {**progress.get(name, {}), 'status': 'failed', 'error': error}
+            if not isinstance(e, SystemExit):
+                traceback.print_exc()
+            raise SystemExit(1)
+        progress[name] = {**progress.get(name, {}), 'status': committer.outcome}
+
+
+class Orchestrator:
+    """Runs many Committer jobs concurrently, each in a process of its own, with a shared progress view."""
+
+    def __init__(self, jobs: List[Tuple[str, dict]], max_workers: int, max_pushes: int):
+        self.jobs = jobs  # (name, CLI-style options) pairs
+        self.max_workers = max_workers
+        self.max_pushes = max_pushes
+
+    @staticmethod
+    def load_jobs(jobs_file: str, defaults: dict) -> List[Tuple[str, dict]]:
+        """Reads a JSON list of jobs; each entry overrides the CLI options (folder, repo, state_file, ...)."""
+        with open(jobs_file, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        jobs, names, state_files, folders = [], set(), set(), set()
+        for i, entry in enumerate(entries):
+            options = {**defaults, **{k.replace('-', '_'): v for k, v in entry.items()}}
+            if not options.get('folder') or not options.get('repo'):
+                raise ValueError(f"Job {i} needs folder and repo")
+            name = options.pop('name', None) or options['repo']
+            if name in names:
+                name = f"{name}#{i}"
+            config = build_config(options)
+            if str(config.state_file) in state_files:
+                raise ValueError(f"Job {name} shares its state file {config.state_file} with another job")
+            if str(config.project_folder) in folders:
+                # Two committers on one folder would race on its index and branch
+                raise ValueError(f"Job {name} uses the folder {config.project_folder} of another job")
+            names.add(name)
+            state_files.add(str(config.state_file))
+            folders.add(str(config.project_folder))
+            jobs.append((name, options))
+        return jobs
+
+    def _render(self, progress) -> None:
+        lines = [f"\033[2J\033[H{'=' * 60}", f"GitHub Auto-Commit Jobs ({len(self.jobs)})", '=' * 60]
+        for name, _ in self.jobs:
+            info = progress.get(name, {})
+            total, completed = info.get('total', 0), info.get('completed', 0)
+            pct = (completed / total * 100) if total else 0
+            detail = info.get('error') or f"ETA {info.get('eta', 'Unknown')}"
+            lines.append(f"{name[:32]:32} {info.get('status', 'queued'):8} {completed:>7}/{total:<7} {pct:5.1f}%  "
+                         f"{detail}")
+        print('\n'.join(lines) + '\n', flush=True)
+
+    @staticmethod
+    def _reap(name: str, process: multiprocessing.Process, progress) -> None:
+        """Marks a job whose process exited without reporting an outcome, e.g. when it was killed, as failed."""
+        process.join()
+        info = progress.get(name, {})
+        if info.get('status') != 'failed' and (process.exitcode or info.get('status') in (None, 'starting', 'running')):
+            progress[name] = {**info, 'status': 'failed', 'error': f"worker exited with code {process.exitcode}"}
+
+    def run(self) -> None:
+        """Runs all jobs; a failing or killed job is reported without stopping the others."""
+        with multiprocessing.Manager() as manager:
+            push_slots = manager.BoundedSemaphore(self.max_pushes)
+            mirror_slots = manager.BoundedSemaphore(self.max_pushes)  # Mirrors get a cap of their own
+            progress = manager.dict()
+            queued = deque(self.jobs)
+            running: Dict[str, multiprocessing.Process] = {}
+            try:
+                while queued or running:
+                    while queued and len(running) < self.max_workers:
+                        name, options = queued.popleft()
+                        args = (name, options, push_slots, mirror_slots, progress)
+                        process = multiprocessing.Process(target=_run_job, args=args, name=f"job {name}")
+                        process.start()
+                        running[name] = process
+                    multiprocessing.connection.wait([process.sentinel for process in running.values()], timeout=2)
+                    for name, process in list(running.items()):
+                        if process.exitcode is not None:
+                            self._reap(name, running.pop(name), progress)
+                    self._render(progress)
+            except KeyboardInterrupt:
+                # Jobs got the same Ctrl-C and save their own state; wait for them to exit
+                print("\nPaused. Waiting for jobs to save their state...")
+                for name, process in running.items():
+                    self._reap(name, process, progress)
+            self._render(progress)
+            statuses = [progress.get(name, {}).get('status', 'queued') for name, _ in self.jobs]
+            failed = [name for (name, _), status in zip(self.jobs, statuses) if status == 'failed']
+            counts = ', '.join(f"{statuses.count(status)} {status}" for status in dict.fromkeys(statuses))
+            print(f"Jobs: {counts}" + (f"; failed: {', '.join(failed)}" if failed else ""))
+
+
+_OPTION_ARGS = {'async_pipeline': 'pipeline', 'remote': 'remotes'}  # CLI option -> Config argument, if renamed
+
+
+def build_config(options: dict) -> Config:
+    """Creates a Config from CLI-style options, as parsed by main() or read from a jobs file.
+
+    Options that are missing or None are left out, so the defaults are the ones of Config.__init__.
+    """
+    params = inspect.signature(Config).parameters
+    kwargs = {}
+    for key, value in options.items():
+        name = _OPTION_ARGS.get(key, key)
+        if value is not None and name in params and name not in ('project_folder', 'github_token', 'repo_name'):
+            kwargs[name] = value
+    return Config(options['folder'], options.get('token'), options['repo'], **kwargs)
+
+
+def main() -> None:
+    """Parses arguments and runs the committer."""
+    parser = argparse.ArgumentParser(description="Commit Python methods individually to a GitHub repository.")
+    parser.add_argument('--folder', help="Path to the project folder (Git repository)")
+    parser.add_argument('--token', help="GitHub personal access token (omit to push without the GitHub API)")
+    parser.add_argument('--repo', help="GitHub repository name (e.g., user/repo)")
+    parser.add_argument('--state-file', help="Path to state file (default: .commit_state.json in project folder)")
+    parser.add_argument('--push-every', type=int, help="Push after this many local commits (default: 1)")
+    parser.add_argument('--push-interval', type=float,
+                        help="Also push when this many seconds passed since the last push (default: off)")
+    parser.add_argument('--remote', action='append', metavar='NAME',
+                        help="Git remote to push to (repeatable, default: origin). The first one is the primary; "
+                             "the others are mirrors pushed in the background, each catching up in one push")
+    parser.add_argument('--push-retries', type=int,
+                        help="Retries of a failed push, with exponential backoff and jitter; a push rejected "
+                             "because the branch moved on is rebased onto it and retried (default: 4)")
+    parser.add_argument('--push-backoff', type=float,
+                        help="Seconds before the first retry, doubled for each one after (default: 2)")
+    parser.add_argument('--push-timeout', type=float, metavar='SECONDS',
+                        help="Kill a push or fetch that takes longer and count it as failed, so a stalled "
+                             "remote cannot hang the job (default: 300, 0 = no limit)")
+    parser.add_argument('--stand-in', metavar='DIR',
+                        help="Push to local bare repositories in DIR, one per remote and created if missing, "
+                             "instead of the real remotes, e.g. to run and test offline")
+    parser.add_argument('--stand-in-failures', type=float, metavar='RATE',
+                        help="Share of stand-in pushes that fail or find a commit from someone else on the "
+                             "branch, to exercise retries and recovery (default: 0)")
+    parser.add_argument('--maintenance-loose', type=int, metavar='N',
+                        help="Pack loose objects during a wait once the repository has this many (default: 2000, "
+                             "0 = off)")
+    parser.add_argument('--maintenance-packs', type=int, metavar='N',
+                        help="Write a multi-pack-index and combine small packs once there are this many "
+                             "(default: 16, 0 = off)")
+    parser.add_argument('--maintenance-commits', type=int, metavar='N',
+                        help="Update the commit-graph every this many commits (default: 1000, 0 = off)")
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help="Only commit files matching this glob (repeatable)")
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help="Skip files and directories matching this glob, on top of .gitignore (repeatable)")
+    parser.add_argument('--state-backend', choices=['json', 'sqlite'],
+                        help="Store state as JSON or in SQLite with per-commit updates (default: json)")
+    parser.add_argument('--engine', choices=['worktree', 'objects', 'fast-import'],
+                        help="Commit by rewriting files in the working tree, write objects directly without "
+                             "touching it, or stream the whole history through git fast-import, dated by the "
+                             "plan's schedule and with no waits (default: worktree)")
+    parser.add_argument('--async-pipeline', action='store_true',
+                        help="Push and prepare the next commit in the background while waiting")
+    parser.add_argument('--min-wait', type=int, help="Minimum seconds between commits (default: 10)")
+    parser.add_argument('--max-wait', type=int, help="Maximum seconds between commits (default: 50)")
+    parser.add_argument('--max-commits', type=int,
+                        help="Stop after this many commits; run again to continue (default: no limit, "
+                             "ignored by fast-import)")
+    parser.add_argument('--group-max-bytes', type=int,
+                        help="Commit non-Python files smaller than this together with others from the same "
+                             "folder, up to this many bytes per commit (default: 0, one commit per file)")
+    parser.add_argument('--group-max-files', type=int,
+                        help="Most files in one grouped commit (default: 20)")
+    parser.add_argument('--parse-workers', type=int,
+                        help="Processes that parse Python files when the plan is built (default: CPU count, "
+                             "1 parses in this process)")
+    parser.add_argument('--seed', type=int,
+                        help="Seed for the commit plan, which is computed once and stored in the state "
+                             "(default: random)")
+    parser.add_argument('--compress-time', action='store_true',
+                        help="Commit back to back without waiting, dating each commit from the plan's "
+                             "schedule backdated to end now")
+    parser.add_argument('--show-plan', action='store_true',
+                        help="Print the remaining commit plan and exit without committing")
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running once everything is committed and commit files as they are created "
+                             "or changed (ignored by fast-import)")
+    parser.add_argument('--watch-interval', type=float,
+                        help="Seconds between checks for changes where inotify is not available (default: 30)")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Export per-phase timings after every commit: Prometheus text if PATH ends in "
+                             ".prom, JSON lines otherwise")
+    parser.add_argument('--jobs', metavar='FILE',
+                        help="JSON list of jobs to run concurrently; each entry takes the options above "
+                             "(folder, repo, state_file, push_every, ...) and inherits unset ones from the CLI")
+    parser.add_argument('--max-workers', type=int, default=16, help="Jobs run at the same time (default: 16)")
+    parser.add_argument('--max-pushes', type=int, default=4,
+                        help="Pushes in flight at the same time across all jobs, and as many again for "
+                             "mirrors (default: 4)")
+    args = parser.parse_args()
+    if args.jobs:
+        try:
+            jobs = Orchestrator.load_jobs(args.jobs, vars(args))
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load jobs file: {e}")
+        Orchestrator(jobs, min(args.max_workers, len(jobs)) or 1, args.max_pushes).run()
+        return
+    if not (args.folder and args.repo):
+        parser.error("--folder and --repo are required unless --jobs is given")
+    config = build_config(vars(args))
+    min_wait, max_wait = config.wait_range
+    if min_wait < 0 or max_wait < min_wait:
+        parser.error("--min-wait must be >= 0 and <= --max-wait")
+    committer = Committer(config)
+    if args.show_plan:
+        committer.show_plan()
+        return
+    committer.run()
+
+
+if __name__ == "__main__":
+    main()
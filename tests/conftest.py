@@ -0,0 +1,58 @@
+"""Shared fixtures: work repositories whose remotes are local bare repositories (see --stand-in)."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import hello  # noqa: E402
+
+
+def run_git(*args, cwd, env=None):
+    return subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True, text=True,
+                          env={**os.environ, **(env or {})}).stdout.strip()
+
+
+class Rolls:
+    """Stands in for a transport's random source, returning planned rolls."""
+
+    def __init__(self, *rolls):
+        self.rolls = list(rolls)
+
+    def random(self):
+        return self.rolls.pop(0)
+
+    def uniform(self, a, b):
+        return a
+
+
+@pytest.fixture
+def work(tmp_path):
+    """A repository with one commit, already pushed to the stand-in origin under tmp_path/stand."""
+    work = tmp_path / 'work'
+    run_git('init', '-b', 'main', str(work), cwd=tmp_path)
+    run_git('config', 'user.name', 'Test', cwd=work)
+    run_git('config', 'user.email', 'test@example.com', cwd=work)
+    (work / 'README').write_text('init\n')
+    run_git('add', 'README', cwd=work)
+    run_git('commit', '-m', 'init', cwd=work)
+    run_git('init', '-q', '--bare', str(tmp_path / 'stand' / 'origin.git'), cwd=tmp_path)
+    run_git('push', '-q', str(tmp_path / 'stand' / 'origin.git'), 'main', cwd=work)
+    return work
+
+
+@pytest.fixture
+def make_config(work):
+    """Builds a Config for the work repository, pushing to stand-ins, with CLI-style option overrides."""
+    def make(**options):
+        return hello.build_config({'folder': str(work), 'repo': 'a/b', 'stand_in': str(work.parent / 'stand'),
+                                   'push_every': 100, 'push_backoff': 0, 'min_wait': 0, 'max_wait': 0, **options})
+    return make
+
+
+@pytest.fixture
+def make_handler(make_config):
+    return lambda **options: hello.GitHandler(make_config(**options))
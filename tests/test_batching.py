@@ -0,0 +1,76 @@
+"""Batched pushes: --push-every, --push-interval, leftovers on resume and the flush on Ctrl-C."""
+import time
+
+import git
+
+import hello
+
+
+def _commit(handler, work, name):
+    (work / name).write_text(name + '\n')
+    assert handler.commit_content([(work / name, None)], f'Add {name}')
+    return git.Repo(work).head.commit.hexsha
+
+
+def _remote_tip(work):
+    return git.Repo(work.parent / 'stand' / 'origin.git').commit('main').hexsha
+
+
+def test_push_every_batches_commits(work, make_handler):
+    handler = make_handler(push_every=3)
+    first = _remote_tip(work)
+    _commit(handler, work, 'a.txt')
+    _commit(handler, work, 'b.txt')
+    assert _remote_tip(work) == first and len(handler.state.unpushed_commits) == 2
+    tip = _commit(handler, work, 'c.txt')
+    assert _remote_tip(work) == tip and handler.state.unpushed_commits == []
+
+
+def test_push_interval_pushes_a_partial_batch(work, make_handler):
+    handler = make_handler(push_every=100, push_interval=60)
+    first = _remote_tip(work)
+    _commit(handler, work, 'a.txt')
+    assert _remote_tip(work) == first
+    handler.last_push = time.monotonic() - 61
+    tip = _commit(handler, work, 'b.txt')
+    assert _remote_tip(work) == tip
+
+
+def test_resume_pushes_leftover_commits(work, make_config, capsys):
+    handler = hello.GitHandler(make_config())
+    tip = _commit(handler, work, 'a.txt')
+    handler.state.save()
+    assert _remote_tip(work) != tip
+
+    committer = hello.Committer(make_config())
+    committer.run()
+    assert "Pushing 1 commit(s) left from the previous run" in capsys.readouterr().out
+    assert _remote_tip(work) == git.Repo(work).head.commit.hexsha
+    assert git.Repo(work).is_ancestor(tip, _remote_tip(work))
+
+
+def test_ctrl_c_during_the_wait_flushes_the_batch(work, make_config, monkeypatch):
+    (work / 'a.txt').write_text('a\n')
+    (work / 'b.txt').write_text('b\n')
+    committer = hello.Committer(make_config(engine='objects', min_wait=5, max_wait=5))
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(hello.time, 'sleep', interrupt)
+    committer.run()
+    assert committer.outcome == 'paused' and committer.commits_made == 1
+    assert _remote_tip(work) == git.Repo(work).head.commit.hexsha
+    assert committer.state.unpushed_commits == []
+    assert committer.config.state_file.exists()
+
+
+def test_worktree_engine_batches_too(work, make_handler):
+    handler = make_handler(push_every=2)
+    first = _remote_tip(work)
+    (work / 'a.txt').write_text('a\n')
+    assert handler.commit_and_push([work / 'a.txt'], 'Add a.txt')
+    assert _remote_tip(work) == first and len(handler.state.unpushed_commits) == 1
+    (work / 'b.txt').write_text('b\n')
+    assert handler.commit_and_push([work / 'b.txt'], 'Add b.txt')
+    assert _remote_tip(work) == git.Repo(work).head.commit.hexsha and handler.state.unpushed_commits == []
@@ -0,0 +1,16 @@
+"""Building a Config from CLI-style options."""
+import hello
+
+
+def test_unset_options_keep_the_config_defaults(tmp_path):
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'push_every': None, 'min_wait': None,
+                                 'include': None, 'remote': None, 'show_plan': False, 'max_pushes': 4})
+    default = hello.Config(str(tmp_path), None, 'a/b')
+    assert vars(config) == vars(default)
+
+
+def test_options_are_passed_through(tmp_path):
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'max_wait': 90, 'async_pipeline': True,
+                                 'remote': ['origin', 'backup'], 'push_timeout': 0})
+    assert config.wait_range == (10, 90) and config.pipeline is True
+    assert config.remotes == ['origin', 'backup'] and config.push_timeout == 0
@@ -0,0 +1,55 @@
+"""The fast-import engine: the whole remaining plan written as one stream."""
+import git
+
+import hello
+from conftest import Rolls, run_git
+
+OLD = 1_600_000_000
+
+
+def _project(work):
+    # Date the initial commit in the past, so the backdated schedule lies between it and now
+    run_git('commit', '--amend', '--no-edit', f'--date=@{OLD}', cwd=work, env={'GIT_COMMITTER_DATE': f'@{OLD}'})
+    run_git('push', '-qf', str(work.parent / 'stand' / 'origin.git'), 'main', cwd=work)
+    (work / 'm.py').write_text('def one():\n    return 1\n\n\ndef two():\n    return 2\n')
+    (work / 'notes.txt').write_text('notes\n')
+    (work / 'data.txt').write_text('data\n')
+
+
+def test_history_follows_the_plan(work, make_config):
+    _project(work)
+    committer = hello.Committer(make_config(engine='fast-import', seed=3, min_wait=60, max_wait=600))
+    committer.run()
+    assert committer.outcome == 'done'
+    plan = [entry for entry in committer.state.plan if entry[0] != 'README']  # Unchanged, so not committed
+    repo = git.Repo(work)
+    commits = list(repo.iter_commits('main', reverse=True))[1:]
+    assert len(commits) == len(plan) == 4
+    for commit, (rel_path, method_idx, when) in zip(commits, plan):
+        changed = repo.git.diff_tree('--no-commit-id', '--name-only', '-r', commit.hexsha).split()
+        assert changed == [rel_path]
+        if method_idx is None:
+            assert commit.message == f"Add {rel_path}"
+        else:
+            assert commit.message.endswith(f" in {rel_path} (index {method_idx})")
+        assert commit.authored_date == commit.committed_date == when
+    assert OLD < commits[0].committed_date
+    assert repo.git.diff('--cached', '--name-only', 'HEAD') == ''  # The index was moved to the new tip
+    assert git.Repo(work.parent / 'stand' / 'origin.git').commit('main') == repo.head.commit
+
+
+def test_failed_push_keeps_the_history_for_the_next_run(work, make_config):
+    _project(work)
+    config = make_config(engine='fast-import', stand_in_failures=1, push_retries=1)
+    committer = hello.Committer(config)
+    committer.git.transports['origin'].rng = Rolls(*[0.1] * 10)  # Every push fails on the network
+    committer.run()
+    assert committer.outcome == 'unpushed'
+    tip = git.Repo(work).head.commit.hexsha
+    assert git.Repo(work.parent / 'stand' / 'origin.git').commit('main').hexsha != tip
+
+    state = hello.State(config)
+    state.load()
+    assert state.unpushed_commits == [tip]
+    assert state.completed_files == {'README', 'm.py', 'notes.txt', 'data.txt'}
+    assert state.plan_pos == len(state.plan)
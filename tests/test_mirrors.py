@@ -0,0 +1,114 @@
+"""Mirror remotes: pushed in the background, each catching up in one push."""
+import threading
+import time
+
+import git
+import pytest
+
+import hello
+from conftest import Rolls, run_git
+
+
+def _commit(handler, work, name):
+    (work / name).write_text(name + '\n')
+    assert handler.commit_content([(work / name, None)], f'Add {name}')
+
+
+def _tip(work, remote):
+    return git.Repo(work.parent / 'stand' / f'{remote}.git').commit('main').hexsha
+
+
+def _count_pushes(monkeypatch, transport):
+    calls = []
+    push_once = transport.push_once
+
+    def counted(refspecs, lease=None):
+        calls.append(lease)
+        return push_once(refspecs, lease)
+
+    monkeypatch.setattr(transport, 'push_once', counted)
+    return calls
+
+
+def test_failing_mirror_catches_up_in_one_push(work, make_handler, monkeypatch):
+    handler = make_handler(remote=['origin', 'mirror'], stand_in_failures=0.5, push_retries=0)
+    handler.transports['origin'].rng = Rolls(*[0.9] * 10)
+    mirror = handler.transports['mirror']
+    mirror.rng = Rolls(0.1)  # A network failure
+    _commit(handler, work, 'a.txt')
+    assert handler.flush() is True
+    handler.mirror_pushes['mirror'].result()
+    assert 'mirror' not in handler.state.remote_heads
+
+    _commit(handler, work, 'b.txt')
+    _commit(handler, work, 'c.txt')
+    mirror.rng = Rolls(0.9)
+    calls = _count_pushes(monkeypatch, mirror)
+    assert handler.flush(wait=True) is True
+    head = git.Repo(work).head.commit.hexsha
+    assert len(calls) == 1 and _tip(work, 'mirror') == head == _tip(work, 'origin')
+    assert handler.state.remote_heads == {'mirror': head}
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_mirror_heads_persist_across_a_resume(work, make_config, monkeypatch, backend):
+    config = make_config(remote=['origin', 'mirror'], state_backend=backend)
+    handler = hello.GitHandler(config)
+    _commit(handler, work, 'a.txt')
+    assert handler.flush(wait=True) is True
+    handler.state.save()
+
+    state = hello.State.create(config)
+    state.load()
+    assert state.remote_heads == {'mirror': git.Repo(work).head.commit.hexsha}
+    resumed = hello.GitHandler(config, state)
+    calls = _count_pushes(monkeypatch, resumed.transports['mirror'])
+    assert resumed.flush(wait=True) is True
+    assert calls == []  # The mirror is known to be up to date
+
+
+def test_mirror_is_force_pushed_with_a_lease_after_a_rebase(work, make_handler, tmp_path, monkeypatch):
+    handler = make_handler(remote=['origin', 'mirror'])
+    _commit(handler, work, 'a.txt')
+    assert handler.flush(wait=True) is True
+
+    other = tmp_path / 'other'
+    run_git('clone', '-q', '-b', 'main', str(handler.transports['origin'].path), str(other), cwd=tmp_path)
+    (other / 'theirs.txt').write_text('theirs\n')
+    run_git('add', 'theirs.txt', cwd=other)
+    run_git('-c', 'user.name=Other', '-c', 'user.email=o@example.com', 'commit', '-m', 'Add theirs', cwd=other)
+    run_git('push', '-q', 'origin', 'main', cwd=other)
+    theirs = run_git('rev-parse', 'HEAD', cwd=other)
+
+    _commit(handler, work, 'b.txt')
+    ours = git.Repo(work).head.commit.hexsha
+    calls = _count_pushes(monkeypatch, handler.transports['mirror'])
+    assert handler.flush(wait=True) is True
+    head = git.Repo(work).head.commit
+    assert head.hexsha != ours and head.parents[0].hexsha == theirs  # Rebased for the primary
+    assert _tip(work, 'mirror') == head.hexsha == _tip(work, 'origin')
+    assert handler.state.remote_heads['mirror'] == head.hexsha
+    assert calls[-1] == f'refs/heads/main:{ours}'  # Replaces only what we pushed there last
+
+
+def test_stalled_mirror_does_not_block_the_primary(work, make_handler, monkeypatch):
+    handler = make_handler(remote=['origin', 'mirror'])
+    mirror = handler.transports['mirror']
+    release = threading.Event()
+    push_once = mirror.push_once
+
+    def stalled(refspecs, lease=None):
+        release.wait(10)
+        return push_once(refspecs, lease)
+
+    monkeypatch.setattr(mirror, 'push_once', stalled)
+    _commit(handler, work, 'a.txt')
+    started = time.monotonic()
+    assert handler.flush() is True
+    assert time.monotonic() - started < 5
+    head = git.Repo(work).head.commit.hexsha
+    assert _tip(work, 'origin') == head and handler.sync_mirrors() is True
+
+    release.set()
+    assert handler.flush(wait=True) is True
+    assert _tip(work, 'mirror') == head and handler.sync_mirrors() is False
@@ -0,0 +1,29 @@
+"""The objects engine: commits written straight into the object database."""
+import git
+
+from conftest import run_git
+
+
+def _files(repo, rev='HEAD'):
+    return sorted(repo.git.ls_tree('-r', '--name-only', rev).split())
+
+
+def test_index_catches_up_on_flush(work, make_handler):
+    handler = make_handler()
+    (work / 'asset.txt').write_text('asset\n')
+    assert handler.commit_content([(work / 'asset.txt', None)], 'Add asset.txt')
+    assert handler.commit_content([(work / 'm.py', b'def m():\n    pass\n')], 'Add m')
+    repo = git.Repo(work)
+    assert len(handler.index_entries) == 2  # Batched, no git process per commit
+    assert handler.flush() is True
+    assert handler.index_entries == {} and repo.git.diff('--cached', '--name-only', 'HEAD') == ''
+    run_git('commit', '--allow-empty', '-m', 'by hand', cwd=work)
+    assert _files(repo) == ['README', 'asset.txt', 'm.py']
+
+
+def test_worktree_commit_keeps_files_committed_as_objects(work, make_handler):
+    handler = make_handler()
+    assert handler.commit_content([(work / 'm.py', b'def m():\n    pass\n')], 'Add m')
+    (work / 'other.txt').write_text('other\n')
+    assert handler.commit_and_push([work / 'other.txt'], 'Add other.txt')
+    assert _files(git.Repo(work)) == ['README', 'm.py', 'other.txt']
@@ -0,0 +1,36 @@
+"""Slicing Python files into units, lazily and in the up-front parse pool."""
+import hello
+
+
+def test_parse_units_slices_whole_definitions():
+    source = ("import os\n\n\n@decor\n@other(1)\ndef foo(a):\n    return a\r\n\n\n"
+              "class K:\n    async def m(self):\n        pass\n")
+    units = hello.parse_units(source)
+    assert [label for _, _, label in units] == ['method foo', 'method m', 'class K']
+    slices = [source[start:end] for start, end, _ in units]
+    assert slices[0] == "@decor\n@other(1)\ndef foo(a):\n    return a\r\n"
+    assert slices[1] == "    async def m(self):\n        pass\n"
+    assert slices[2] == "class K:\n    async def m(self):\n        pass\n"
+
+
+def test_parse_units_last_line_without_newline():
+    source = "def a():\n    pass\n\ndef b():\n    return 1"
+    assert [source[start:end] for start, end, _ in hello.parse_units(source)] == [
+        "def a():\n    pass\n", "def b():\n    return 1"]
+
+
+
+def test_parse_pool_fills_the_manifest(work, make_config, capsys):
+    for i in range(40):
+        (work / f'm{i}.py').write_text(f'def f{i}():\n    return {i}\n\n\nclass C{i}:\n    pass\n')
+    committer = hello.Committer(make_config(parse_workers=2))
+    committer.work.apply_state(committer.state)
+    committer._parse_all()
+    assert "Parsed 40 Python files in 2 processes" in capsys.readouterr().out
+    for i in range(40):
+        rel_path = f'm{i}.py'
+        source = (work / rel_path).read_text()
+        st = (work / rel_path).stat()
+        assert committer.manifest.is_fresh(rel_path, st)
+        units = committer.manifest.lookup(rel_path, st, source.encode())
+        assert [list(unit) for unit in units] == [list(unit) for unit in hello.parse_units(source)]
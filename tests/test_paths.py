@@ -0,0 +1,40 @@
+"""Compact path containers: IndexedSet, PathTable, PathSet and the packed path lists."""
+import random
+
+import pytest
+
+import hello
+
+
+@pytest.mark.parametrize('make', [hello.IndexedSet, lambda: hello.PathSet(hello.PathTable())])
+def test_indexed_sets(make):
+    items = make()
+    for name in ('a', 'b', 'c', 'd', 'b'):
+        items.add(name)
+    assert len(items) == 4
+    items.discard('b')
+    items.discard('missing')
+    assert 'b' not in items and 'missing' not in items
+    assert sorted(items) == ['a', 'c', 'd']
+    rng = random.Random(1)
+    assert {items.choice(rng) for _ in range(50)} == {'a', 'c', 'd'}
+    for name in ('a', 'c', 'd'):
+        items.discard(name)
+    assert len(items) == 0 and list(items) == []
+    items.add('b')
+    assert list(items) == ['b']
+
+
+def test_path_table_ids():
+    table = hello.PathTable(['b', 'a'])
+    assert table.get('a') == 0 and table.get('b') == 1
+    assert table.add('c') == 2 and table.add('a') == 0
+    table.discard('a')
+    assert 'a' not in table and len(table) == 2
+    assert table.add('d') == 3  # Ids of removed paths are not reused
+
+
+def test_packed_paths_round_trip():
+    paths = {'src/a.py', 'src/b.py', 'public/ü.svg', 'README.md'}
+    assert set(hello._unpack_paths(hello._pack_paths(paths))) == paths
+    assert hello._unpack_paths(hello._pack_paths([])) == []
@@ -0,0 +1,36 @@
+"""The asyncio pipeline: pushes and picks overlapping the wait between commits."""
+import threading
+import time
+
+import git
+
+import hello
+
+
+def test_state_is_not_saved_while_a_pick_runs(work, make_config, monkeypatch):
+    (work / 'a.txt').write_text('a\n')
+    picking = threading.Event()
+    picks, saved_during_pick = [], []
+    pick_next, save_state = hello.Committer._pick_next, hello.Committer._save_state
+
+    def slow_pick(self):
+        picks.append(None)
+        picking.set()
+        try:
+            if len(picks) == 2:  # The pick started after the first commit outlasts the one-second wait
+                time.sleep(1.5)
+            return pick_next(self)
+        finally:
+            picking.clear()
+
+    def checked_save(self):
+        saved_during_pick.append(picking.is_set())
+        save_state(self)
+
+    monkeypatch.setattr(hello.Committer, '_pick_next', slow_pick)
+    monkeypatch.setattr(hello.Committer, '_save_state', checked_save)
+    committer = hello.Committer(make_config(async_pipeline=True, push_every=1, min_wait=1, max_wait=1))
+    committer.run()
+    assert committer.outcome == 'done' and committer.commits_made == 2
+    assert saved_during_pick and not any(saved_during_pick)
+    assert git.Repo(work.parent / 'stand' / 'origin.git').commit('main') == git.Repo(work).head.commit
@@ -0,0 +1,94 @@
+"""The commit plan: its backdated schedule and reloading it from state."""
+import time
+
+import git
+import pytest
+
+import hello
+from conftest import run_git
+
+
+def _plan(work, make_config, head_date=None, **options):
+    if head_date is not None:
+        run_git('commit', '--amend', '--no-edit', f'--date=@{head_date}', cwd=work,
+                env={'GIT_COMMITTER_DATE': f'@{head_date}'})
+    for i in range(5):
+        (work / f'f{i}.txt').write_text(f'{i}\n')
+    committer = hello.Committer(make_config(**options))
+    committer.work.apply_state(committer.state)
+    return committer._plan_commits(1, backdate=True)
+
+
+def test_backdated_schedule_ends_now_with_the_configured_gaps(work, make_config):
+    start = int(time.time())
+    plan = _plan(work, make_config, head_date=start - 10 ** 6, min_wait=60, max_wait=120)
+    dates = [when for _, _, when in plan]
+    assert start <= dates[-1] <= time.time()
+    assert all(60 <= b - a <= 120 for a, b in zip(dates, dates[1:]))
+
+
+def test_schedule_is_squeezed_between_a_recent_head_and_now(work, make_config):
+    head = int(time.time()) - 100
+    plan = _plan(work, make_config, head_date=head, min_wait=600, max_wait=600)
+    dates = [when for _, _, when in plan]
+    assert head <= dates[0] and dates == sorted(dates) and dates[-1] <= time.time()
+    assert dates[-1] >= head + 100
+
+
+def test_head_dated_in_the_future_stops_the_plan(work, make_config):
+    with pytest.raises(SystemExit):
+        _plan(work, make_config, head_date=int(time.time()) + 3600)
+
+
+def test_fast_import_never_dates_commits_in_the_future(work, make_config):
+    for i in range(5):
+        (work / f'f{i}.txt').write_text(f'{i}\n')
+    committer = hello.Committer(make_config(engine='fast-import', min_wait=60, max_wait=600))
+    committer.run()
+    now = time.time()
+    commits = list(git.Repo(work).iter_commits('main'))
+    assert committer.outcome == 'done' and len(commits) == 6
+    assert all(commit.committed_date <= now and commit.authored_date <= now for commit in commits)
+
+
+def test_unreadable_plan_is_replanned_without_losing_state(tmp_path):
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b'})
+    state = hello.State(config)
+    state.completed_files = {'a.txt'}
+    state.set_plan(7, [('b.txt', None, 1), ('c.txt', None, 2)])
+    state.plan_pos = 1
+    state.save()
+    config.plan_file.write_text(config.plan_file.read_text()[:10])
+
+    loaded = hello.State(config)
+    loaded.load()
+    assert config.state_file.exists()
+    assert loaded.completed_files == {'a.txt'} and loaded.plan_seed == 7 and loaded.plan == []
+
+
+def test_grouped_files_fit_the_budget_and_are_stat_once(work, make_config, monkeypatch):
+    sizes = {f'd/s{i}.txt': 10 for i in range(8)}
+    sizes.update({'d/big.txt': 1000, 'e/s.txt': 10})
+    for rel_path, size in sizes.items():
+        (work / rel_path).parent.mkdir(exist_ok=True)
+        (work / rel_path).write_text('x' * size)
+    stats = []
+    file_size = hello.Committer._file_size
+    monkeypatch.setattr(hello.Committer, '_file_size', lambda self, rel_path: stats.append(rel_path) or
+                        file_size(self, rel_path))
+    committer = hello.Committer(make_config(group_max_bytes=35, group_max_files=20))
+    committer.work.apply_state(committer.state)
+    plan = committer._plan_commits(1, backdate=False)
+
+    groups = []
+    for rel_path, method_idx, _ in plan:
+        if method_idx == hello.State.GROUPED:
+            groups[-1].append(rel_path)
+        else:
+            groups.append([rel_path])
+    assert sorted(path for group in groups for path in group) == sorted([*sizes, 'README'])
+    for group in groups:
+        assert len({path.rpartition('/')[0] for path in group}) == 1 and len(group) <= 3
+        assert len(group) == 1 or sum(sizes[path] for path in group) <= 35
+    assert ['d/big.txt'] in groups and any(len(group) == 3 for group in groups)
+    assert max(stats.count(path) for path in sizes) <= 2  # Indexed once, and once more if picked itself
@@ -0,0 +1,51 @@
+"""Push retries and rejected-push recovery, against stand-in remotes."""
+import git
+
+from conftest import Rolls, run_git
+
+
+def test_push_retries_then_rebases_onto_a_moved_branch(work, make_handler):
+    handler = make_handler(stand_in_failures=0.5, push_retries=2)
+    transport = handler.transports['origin']
+    (work / 'a.txt').write_text('a\n')
+    assert handler.commit_content([(work / 'a.txt', None)], 'Add a.txt', when=1_700_000_000)
+    ours = git.Repo(work).head.commit
+
+    # A network failure, then someone else's commit on the branch (rejected, so rebased), then success
+    transport.rng = Rolls(0.1, 0.3, 0.9)
+    assert handler.flush() is True
+    assert handler.state.unpushed_commits == []
+    remote = git.Repo(transport.path)
+    tip = remote.commit('main')
+    assert tip.hexsha == git.Repo(work).head.commit.hexsha
+    assert tip.parents[0].author.name == 'Stand-in'
+    assert (tip.message, tip.authored_date, tip.committed_date) == (ours.message, 1_700_000_000, 1_700_000_000)
+    assert sorted(remote.git.ls_tree('-r', '--name-only', 'main').split()) == ['README', 'a.txt']
+    assert git.Repo(work).git.diff('--cached', '--name-only', 'HEAD') == ''
+
+
+def test_rebase_keeps_files_pushed_by_someone_else(work, make_handler, tmp_path):
+    handler = make_handler()
+    other = tmp_path / 'other'
+    run_git('clone', '-q', '-b', 'main', str(handler.transports['origin'].path), str(other), cwd=tmp_path)
+    (other / 'theirs.txt').write_text('theirs\n')
+    run_git('add', 'theirs.txt', cwd=other)
+    run_git('-c', 'user.name=Other', '-c', 'user.email=o@example.com', 'commit', '-m', 'Add theirs', cwd=other)
+    run_git('push', '-q', 'origin', 'main', cwd=other)
+
+    (work / 'ours.txt').write_text('ours\n')
+    assert handler.commit_content([(work / 'ours.txt', None)], 'Add ours.txt')
+    assert handler.flush() is True
+    head = git.Repo(work).head.commit
+    assert head.message == 'Add ours.txt' and head.parents[0].message.strip() == 'Add theirs'
+    assert sorted(git.Repo(work).git.ls_tree('-r', '--name-only', 'HEAD').split()) == [
+        'README', 'ours.txt', 'theirs.txt']
+
+
+def test_push_gives_up_after_retries(work, make_handler):
+    handler = make_handler(stand_in_failures=1, push_retries=2)
+    handler.transports['origin'].rng = Rolls(0.1, 0.1, 0.1)
+    (work / 'a.txt').write_text('a\n')
+    assert handler.commit_content([(work / 'a.txt', None)], 'Add a.txt')
+    assert handler.flush() is False
+    assert len(handler.state.unpushed_commits) == 1
@@ -0,0 +1,88 @@
+"""Ignore rules and the file scanner."""
+import pytest
+
+import hello
+
+
+
+def _ignored(patterns, rel_path, is_dir=False, base=''):
+    return hello.IgnoreRules(base, patterns).match(rel_path, is_dir)
+
+
+@pytest.mark.parametrize('pattern, rel_path, is_dir, expected', [
+    ('*.log', 'a.log', False, True),
+    ('*.log', 'deep/er/a.log', False, True),
+    ('*.log', 'a.log.txt', False, None),
+    ('/build', 'build', True, True),
+    ('/build', 'src/build', True, None),
+    ('docs/*.md', 'docs/a.md', False, True),
+    ('docs/*.md', 'docs/sub/a.md', False, None),
+    ('**/cache', 'a/b/cache', True, True),
+    ('a/**', 'a/x/y.txt', False, True),
+    ('a/**/z', 'a/z', False, True),
+    ('a/**/z', 'a/x/y/z', False, True),
+    ('out/', 'out', True, True),
+    ('out/', 'out', False, None),
+    ('f?.txt', 'f1.txt', False, True),
+    ('f?.txt', 'f/.txt', False, None),
+    ('\\#notes', '#notes', False, True),
+    ('[]a]', ']', False, True),
+    ('[]a]', 'a', False, True),
+    ('[]a]', 'b', False, None),
+    ('[!]]x', 'ax', False, True),
+    ('[!]]x', ']x', False, None),
+    ('[!a-c].txt', 'd.txt', False, True),
+    ('[!a-c].txt', 'b.txt', False, None),
+    ('[[:alpha:]][[:digit:]]', 'q7', False, True),
+    ('[[:alpha:]][[:digit:]]', '7q', False, None),
+    ('x[\\-]', 'x-', False, True),
+    ('x[\\-]', 'xa', False, None),
+    ('a[]', 'a[]', False, True),
+    ('[!]', '[!]', False, True),
+])
+def test_ignore_patterns(pattern, rel_path, is_dir, expected):
+    assert _ignored([pattern], rel_path, is_dir) is expected
+
+
+def test_ignore_negation_and_base():
+    assert _ignored(['*.txt', '!keep.txt'], 'keep.txt') is False
+    assert _ignored(['*.txt', '!keep.txt'], 'drop.txt') is True
+    assert _ignored(['*.py'], 'sub/a.py', base='sub/') is True
+    assert _ignored(['*.py'], 'other/a.py', base='sub/') is None
+
+
+def test_uncompilable_ignore_rules_are_skipped(capsys):
+    rules = hello.IgnoreRules('', ['[z-a]', '[[:bogus:]]', '*.tmp'])
+    assert len(rules.rules) == 1
+    assert rules.match('x.tmp', False) is True
+    assert capsys.readouterr().out.count('Warning: skipping ignore pattern') == 2
+
+
+def test_scanner_prunes_ignored_and_skips_own_files(tmp_path):
+    files = ['.gitignore', '.github/workflow.yml', 'hello.py', 'src/m.py', 'a.log', 'node_modules/x/index.js',
+             '.git/HEAD', 'hello.json', 'hello.manifest.json', 'hello.plan.json', 'hello.db-wal', 'hello.log']
+    for rel_path in files:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text('x\n')
+    (tmp_path / '.gitignore').write_text('node_modules/\n*.log\n[]x]\n')
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'state_file': str(tmp_path / 'hello.json')})
+    assert sorted(hello.FileScanner(config).scan()) == ['.github/workflow.yml', '.gitignore', 'hello.py', 'src/m.py']
+
+
+def test_scanner_skips_extensionless_state_file(tmp_path):
+    for name in ('mystate', 'mystate.txt'):
+        (tmp_path / name).write_text('{}')
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'state_file': str(tmp_path / 'mystate')})
+    assert list(hello.FileScanner(config).scan()) == ['mystate.txt']
+
+
+
+def test_scanner_skips_git_entries_and_nested_repositories(tmp_path):
+    files = ['top.py', '.git', 'pkg/.git', 'pkg/m.py', 'sub/.git', 'sub/x.py', 'nested/.git/HEAD', 'nested/y.py']
+    for rel_path in files:
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text('gitdir: elsewhere\n')
+    (tmp_path / 'pkg' / '.git').unlink()
+    (tmp_path / 'pkg' / '.git').symlink_to(tmp_path / 'nowhere')
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'state_file': str(tmp_path / 'hello.json')})
+    assert sorted(hello.FileScanner(config).scan()) == ['top.py']
@@ -0,0 +1,52 @@
+"""State backends: the JSON files and the SQLite database they migrate into."""
+import sqlite3
+
+import hello
+
+
+def _config(tmp_path, backend):
+    return hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'state_backend': backend,
+                               'state_file': str(tmp_path / 'hello.json')})
+
+
+def test_json_state_migrates_into_sqlite(tmp_path):
+    state = hello.State(_config(tmp_path, 'json'))
+    state.mark_completed('src/done.py')
+    state.mark_method('src/half.py', 0)
+    state.mark_method('src/half.py', 3)
+    state.add_unpushed('a' * 40)
+    state.set_remote_head('mirror', 'b' * 40)
+    state.set_plan(7, [('src/half.py', 1, 1_700_000_000), ('README', None, 1_700_000_100)])
+    state.plan_pos = 1
+    state.save()
+
+    config = _config(tmp_path, 'sqlite')
+    migrated = hello.SQLiteState(config)
+    migrated.load()
+    assert migrated.completed_files == {'src/done.py'}
+    assert migrated.committed_methods('src/half.py') == [0, 3]
+    assert migrated.unpushed_commits == ['a' * 40] and migrated.remote_heads == {'mirror': 'b' * 40}
+    assert (migrated.plan_seed, migrated.plan_pos) == (7, 1)
+    assert migrated.plan == [('src/half.py', 1, 1_700_000_000), ('README', None, 1_700_000_100)]
+    assert not config.state_file.exists() and not config.plan_file.exists()
+
+    moved = [tmp_path / 'hello.json.migrated', config.plan_file.with_name(config.plan_file.name + '.migrated')]
+    assert all(path.exists() for path in moved)
+    migrated.remove()
+    assert not any(path.exists() for path in moved) and not config.state_db.exists()
+
+
+def test_per_method_rows_are_folded_into_bitsets(tmp_path):
+    config = _config(tmp_path, 'sqlite')
+    with sqlite3.connect(config.state_db) as conn:
+        conn.execute('CREATE TABLE partial_methods (path TEXT, method_idx INTEGER, PRIMARY KEY (path, method_idx))')
+        conn.executemany('INSERT INTO partial_methods VALUES (?, ?)', [('a.py', 0), ('a.py', 2), ('b.py', 5)])
+        conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value)')
+        conn.execute("INSERT INTO meta VALUES ('start_time', 1700000000.0)")
+    conn.close()
+
+    state = hello.SQLiteState(config)
+    state.load()
+    assert state.committed_methods('a.py') == [0, 2] and state.committed_methods('b.py') == [5]
+    tables = {name for (name,) in state.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert 'partial_methods' not in tables and not state.first_run
@@ -0,0 +1,46 @@
+"""The --watch file watcher, with inotify and its fallback to rescans."""
+import errno
+
+import pytest
+
+import hello
+
+
+def _watcher(tmp_path):
+    (tmp_path / 'a.txt').write_text('a\n')
+    config = hello.build_config({'folder': str(tmp_path), 'repo': 'a/b', 'state_file': str(tmp_path / 'hello.json'),
+                                 'watch_interval': 0})
+    scanner = hello.FileScanner(config)
+    stats = {}
+    for _ in scanner.scan(stats=stats):
+        pass
+    watcher = hello.TreeWatcher(config, scanner, stats)
+    if not watcher.inotify:
+        pytest.skip("inotify is not available")
+    return watcher
+
+
+def test_directory_removed_before_its_event_is_handled(tmp_path):
+    watcher = _watcher(tmp_path)
+    (tmp_path / 'gone').mkdir()
+    (tmp_path / 'gone').rmdir()
+    assert watcher.changes() == (set(), set())
+    assert watcher.inotify and str(tmp_path / 'gone') not in watcher.scanner.dirs
+    (tmp_path / 'b.txt').write_text('b\n')
+    assert watcher.changes() == ({'b.txt'}, set())
+
+
+def test_running_out_of_watches_falls_back_to_rescans(tmp_path, monkeypatch):
+    watcher = _watcher(tmp_path)
+
+    def no_space(path):
+        raise OSError(errno.ENOSPC, f"cannot watch {path}: No space left on device")
+
+    monkeypatch.setattr(watcher.inotify, 'add_watch', no_space)
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'c.txt').write_text('c\n')
+    (tmp_path / 'a.txt').unlink()
+    assert watcher.changes() == ({'sub/c.txt'}, {'a.txt'})  # One rescan covers the events not handled
+    assert watcher.inotify is None and watcher.watches == {}
+    (tmp_path / 'd.txt').write_text('d\n')
+    assert watcher.changes() == ({'d.txt'}, set())